@@ -0,0 +1,77 @@
+'''
+Legacy implementations of the Finstat Extractor
+
+The functions the component used before they were replaced by faster
+ones. They are kept as the baselines of the benchmarks and as the
+reference the tests compare the new implementations with.
+'''
+
+import hashlib
+
+import xmltodict
+
+
+def encrypt_string(hash_string):
+    """Encrypts a string with sha256
+
+            Parameters:
+            hash_string (string): Holds the string to be hashed
+
+            Returns:
+            sha_signature (string): Holds the hashed string
+    """
+    sha_signature = \
+        hashlib.sha256(hash_string.encode()).hexdigest()
+    return sha_signature
+
+
+def get_hash(api_key, private_key, ico):
+    """Creates a hash key that is needed for the api, replaced by finstat.signing.Signer
+
+        The API defines how this key should be constructed in the API documentation
+
+            Parameters:
+            api_key (string): The API key of the API user
+            private_key (string): The private key of the API user
+            ico (string): The ICO code of the company
+
+            Returns:
+            hash_key (string): Holds the hashed key
+    """
+    hash_key_string = "SomeSalt+" + api_key + "+" + private_key + "++" + ico + "+ended"
+    hash_key = encrypt_string(hash_key_string)
+    return hash_key
+
+
+def flatten_json(json_dict, delim):
+    """Flattens a JSON dictionary so it can be stored in a single table row
+
+            Parameters:
+            json_dict (dict): Holds the json data
+            delim (string): The delimiter to be used to create flattened keys
+
+            Returns:
+            flattened_dict (dict): Holds the flattened dictionary
+    """
+    flattened_dict = {}
+    for i in json_dict.keys():
+        if isinstance(json_dict[i], dict):
+            get = flatten_json(json_dict[i], delim)
+            for j in get.keys():
+                flattened_dict[i + delim + j] = get[j]
+        else:
+            flattened_dict[i] = json_dict[i]
+
+    return flattened_dict
+
+
+def parse_with_xmltodict(response_text):
+    """Converts a DetailResult response to a flat row with xmltodict, replaced by finstat.xml_parser
+
+            Parameters:
+            response_text (string): Holds the XML response
+
+            Returns:
+            row (dict): Holds the flattened response
+    """
+    return flatten_json(dict(xmltodict.parse(response_text)["DetailResult"]), "__")
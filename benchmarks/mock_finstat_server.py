@@ -0,0 +1,251 @@
+'''
+Local stand-in for the Finstat API
+
+Serves generated DetailResult XML responses for the detail, extended and
+ultimate request types with configurable latency and error rates, so the
+extractor can be benchmarked and tested without spending API quota.
+
+Run standalone with:
+    python -m benchmarks.mock_finstat_server --port 8080 --latency 0.05
+'''
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+REQUEST_TYPES = ["detail", "extended", "ultimate"]
+
+XML_HEADER = '<?xml version="1.0" encoding="utf-8"?>\n' \
+             '<DetailResult xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" ' \
+             'xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns="http://www.finstat.sk/">\n'
+XML_FOOTER = '</DetailResult>\n'
+BULK_HEADER = '<?xml version="1.0" encoding="utf-8"?>\n' \
+              '<ArrayOfDetailResult xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" ' \
+              'xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns="http://www.finstat.sk/">\n'
+BULK_FOOTER = '</ArrayOfDetailResult>\n'
+# path of the bulk endpoint relative to the request type
+BULK_PATH = "bulk"
+NIL = object()
+
+FINANCIAL_ITEMS = ["Assets", "NonCurrentAssets", "CurrentAssets", "Inventory", "Receivables", "Cash", "Equity",
+                   "BasicCapitalValue", "RetainedEarnings", "Liabilities", "LongTermLiabilities",
+                   "ShortTermLiabilities", "BankLoans", "Revenue", "SalesOfGoods", "SalesOfServices", "Costs",
+                   "PersonnelCosts", "Depreciation", "EBITDA", "EBIT", "InterestCosts", "Tax", "Profit",
+                   "CashFlow", "ROA", "ROE", "CurrentRatio", "QuickRatio", "DebtRatio"]
+FINANCIAL_YEARS = 5
+
+
+def _element(name, value, indent="  "):
+    if value is NIL:
+        return f'{indent}<{name} xsi:nil="true" />\n'
+    if value is None:
+        return f'{indent}<{name} />\n'
+    if isinstance(value, list):
+        return f'{indent}<{name}>\n' + "".join(_element(*item, indent=indent + "  ") for item in value) + \
+            f'{indent}</{name}>\n'
+    return f'{indent}<{name}>{escape(str(value))}</{name}>\n'
+
+
+def render_detail_result(ico, request_type):
+    """Generates a DetailResult XML similar to the real Finstat response
+
+            Parameters:
+            ico (string): Holds the ICO of the company
+            request_type (string): detail, extended or ultimate, each adds more fields
+
+            Returns:
+            response_text (string): Holds the XML response
+    """
+    rnd = random.Random(ico)
+    revenue = rnd.randint(10000, 10 ** 9)
+    fields = [
+        ("Ico", ico), ("RegisterNumberText", f"Obchodný register Okresného súdu Bratislava I, vložka č. {ico}/B"),
+        ("Dic", "20" + ico), ("IcDPH", "SK20" + ico), ("Name", f"Spoločnosť {ico} & partneri, s.r.o."),
+        ("Street", "Hlavná"), ("StreetNumber", rnd.randint(1, 200)), ("ZipCode", "811 01"), ("City", "Bratislava"),
+        ("District", "Bratislava I"), ("Region", "Bratislavský"), ("Activity", "Počítačové služby"),
+        ("Created", "2005-03-01T00:00:00"), ("Cancelled", NIL), ("SuspendedAsPerson", "false"),
+        ("Url", f"https://finstat.sk/{ico}"), ("Warning", "false"), ("WarningUrl", None),
+        ("PaymentOrderWarning", "false"), ("PaymentOrderUrl", None), ("OrChange", "false"), ("OrChangeUrl", None),
+        ("Revenue", revenue), ("SkNaceCode", "62010"), ("SkNaceText", "Počítačové programovanie"),
+        ("SkNaceDivision", "Počítačové programovanie, poradenstvo a súvisiace služby"),
+        ("SkNaceGroup", "Počítačové programovanie"), ("LegalFormCode", "112"),
+        ("LegalFormText", "Spoločnosť s ručením obmedzeným"), ("RpvsInsert", None), ("RpvsUrl", None),
+        ("ProfitActual", round(revenue * rnd.uniform(-0.1, 0.2), 2)), ("RevenueActual", revenue),
+        ("SalesCategory", "1 - 2 mil. €"), ("HasKaR", "false"), ("HasDebt", "false"),
+    ]
+    if request_type in ("extended", "ultimate"):
+        fields += [
+            ("EmployeeCode", rnd.randint(1, 15)), ("EmployeeText", "10 - 19 zamestnancov"),
+            ("OwnershipTypeCode", "2"), ("OwnershipTypeText", "Súkromné tuzemské"), ("ActualYear", 2019),
+            ("CreditScoreValue", round(rnd.uniform(0, 5), 2)), ("CreditScoreState", "Minimálne riziko"),
+            ("ProfitPrev", rnd.randint(-10 ** 6, 10 ** 7)), ("RevenuePrev", rnd.randint(10000, 10 ** 9)),
+            ("Phones", [("string", "+421 2 1234 5678"), ("string", "+421 900 123 456")]),
+            ("Emails", [("string", f"info@{ico}.sk")]),
+            ("Address", [("Name", f"Spoločnosť {ico}"), ("Street", "Hlavná"), ("City", "Bratislava"),
+                         ("Country", NIL)]),
+            ("Debts", None), ("StateReceivables", None),
+        ]
+    if request_type == "ultimate":
+        fields += [
+            ("Persons", [("Person", [("FullName", f"Ing. Konateľ {i}"), ("Function", "Konateľ"),
+                                     ("From", "2010-01-01T00:00:00")]) for i in range(rnd.randint(1, 3))]),
+            ("Financials", [(f"Year{2019 - year}", [(item, rnd.randint(-10 ** 6, 10 ** 8))
+                                                    for item in FINANCIAL_ITEMS])
+                            for year in range(FINANCIAL_YEARS)]),
+        ]
+    return XML_HEADER + "".join(_element(name, value) for name, value in fields) + XML_FOOTER
+
+
+def render_bulk_result(icos, request_type):
+    """Generates the response of the bulk endpoint, an array of the DetailResults of the given ICOs
+
+            Parameters:
+            icos (list): Holds the ICOs to include, the unknown ones are left out by the caller
+            request_type (string): detail, extended or ultimate
+
+            Returns:
+            response_text (string): Holds the XML response
+    """
+    results = []
+    for ico in icos:
+        # the namespaces are declared once on the array element
+        detail_result = render_detail_result(ico, request_type)[len(XML_HEADER):-len(XML_FOOTER)]
+        results.append("<DetailResult>\n" + detail_result + "</DetailResult>\n")
+    return BULK_HEADER + "".join(results) + BULK_FOOTER
+
+
+def is_invalid_ico(ico, invalid_rate):
+    """
+    Decides deterministically which ICOs are unknown to the mock server, so repeated requests agree.
+    """
+    digest = hashlib.sha256(ico.encode()).digest()
+    return int.from_bytes(digest[:4], "big") / 2 ** 32 < invalid_rate
+
+
+class MockFinstatServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering GET /api/<request_type>?ico=...
+
+    With bulk set it also answers GET /api/<request_type>/bulk?ico=...,... with the DetailResults of all the
+    known ICOs.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, invalid_rate=0.0, throttle_rate=0.0, error_rate=0.0, seed=0,
+                 bulk=False, outage_after=None, unavailable=None):
+        """
+        :param port: port to listen on, 0 picks a free one
+        :param latency: seconds every request takes
+        :param invalid_rate: share of ICOs answered with 404
+        :param throttle_rate: share of requests answered with 429
+        :param error_rate: share of requests answered with 503
+        :param bulk: serve the bulk endpoint, without it the bulk requests are answered with 404
+        :param outage_after: number of requests after which every request is answered with 503
+        :param unavailable: dict of request type to the ICOs answered with 404 for that request type only
+        """
+        ThreadingHTTPServer.__init__(self, ("127.0.0.1", port), MockFinstatHandler)
+        self.latency = latency
+        self.invalid_rate = invalid_rate
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.bulk = bulk
+        self.outage_after = outage_after
+        self.unavailable = unavailable or {}
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/"
+
+    def next_random(self):
+        """
+        Counts the request and returns its random number and whether it falls into the outage.
+        """
+        with self._lock:
+            self.request_count += 1
+            outage = self.outage_after is not None and self.request_count > self.outage_after
+            return self.random.random(), outage
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class MockFinstatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/").split("/")
+        bulk = path[-1] == BULK_PATH
+        request_type = path[-2] if bulk else path[-1]
+        ico = parse_qs(url.query).get("ico", [""])[0]
+        server = self.server
+        chance, outage = server.next_random()
+        if server.latency:
+            time.sleep(server.latency)
+
+        if request_type not in REQUEST_TYPES or (bulk and not server.bulk):
+            self._respond(404, "Not Found")
+        elif outage:
+            self._respond(503, "Service Unavailable")
+        elif chance < server.throttle_rate:
+            self._respond(429, "Too Many Requests", {"Retry-After": "1"})
+        elif chance < server.throttle_rate + server.error_rate:
+            self._respond(503, "Service Unavailable")
+        elif bulk:
+            icos = [ico for ico in ico.split(",") if ico and not is_invalid_ico(ico, server.invalid_rate)
+                    and ico not in server.unavailable.get(request_type, ())]
+            self._respond(200, render_bulk_result(icos, request_type))
+        elif not ico or is_invalid_ico(ico, server.invalid_rate) or ico in server.unavailable.get(request_type, ()):
+            self._respond(404, "Not Found")
+        else:
+            self._respond(200, render_detail_result(ico, request_type))
+
+    def _respond(self, status, body, headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml; charset=utf-8" if status == 200 else "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every request takes")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="share of ICOs answered with 404")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--bulk", action="store_true", help="serve the bulk endpoint")
+    args = parser.parse_args()
+    server = MockFinstatServer(args.port, args.latency, args.invalid_rate, args.throttle_rate, args.error_rate,
+                               bulk=args.bulk)
+    print(f"Serving the mock Finstat API at {server.base_url}")
+    server.serve_forever()
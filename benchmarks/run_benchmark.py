@@ -0,0 +1,163 @@
+'''
+Throughput benchmark of the Finstat Extractor
+
+Runs the fetch, parse and write path of the component against the local
+mock Finstat server and prints the results as JSON, so the numbers can be
+compared between releases.
+
+Run from the repository root with:
+    python -m benchmarks.run_benchmark --icos 2000 --request-type ultimate --workers 8 --latency 0.02
+'''
+
+import argparse
+import csv
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "src"))
+
+from benchmarks.mock_finstat_server import MockFinstatServer, REQUEST_TYPES  # noqa: E402
+from benchmarks.legacy import get_hash, parse_with_xmltodict  # noqa: E402
+from component import APP_VERSION, get_json_response  # noqa: E402
+from finstat.fetcher import fetch_ordered  # noqa: E402
+from finstat.finstat_client import FinstatClient  # noqa: E402
+from finstat.finstat_result import FinstatResultWriter  # noqa: E402
+from finstat.ico_reader import get_icos_from_file  # noqa: E402
+from finstat.signing import Signer  # noqa: E402
+from finstat.xml_parser import parse_detail_result  # noqa: E402
+
+API_KEY = "benchmark"
+PRIVATE_KEY = "benchmark"
+# number of responses kept for the isolated parse and write stages
+SAMPLE_SIZE = 1000
+
+
+def write_input_table(path, ico_count):
+    """
+    Writes an input table with the ico column and a few other columns, as Keboola would.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as input_file:
+        writer = csv.writer(input_file)
+        writer.writerow(["name", "ico", "city", "note"])
+        for i in range(ico_count):
+            writer.writerow([f"Company {i}", f"{i:08d}", "Bratislava", "x" * 50])
+
+
+def latency_summary(latencies):
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    return {"count": len(ordered),
+            "mean_ms": statistics.mean(ordered) * 1000,
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p95_ms": ordered[int(len(ordered) * 0.95)] * 1000,
+            "max_ms": ordered[-1] * 1000}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(ico_count, request_type, workers, latency, invalid_rate, throttle_rate, error_rate):
+    stages = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            MockFinstatServer(latency=latency, invalid_rate=invalid_rate, throttle_rate=throttle_rate,
+                              error_rate=error_rate) as server, \
+            FinstatClient(pool_size=workers, base_url=server.base_url) as client:
+        input_path = os.path.join(tmp_dir, "input.csv")
+        write_input_table(input_path, ico_count)
+
+        icos, seconds = timed(lambda: list(get_icos_from_file(input_path)))
+        stages["get_icos_from_file"] = {"seconds": seconds, "icos_per_second": len(icos) / seconds}
+
+        _, seconds = timed(lambda: [get_hash(API_KEY, PRIVATE_KEY, ico) for ico in icos])
+        stages["get_hash"] = {"seconds": seconds, "per_ico_us": seconds / len(icos) * 10 ** 6}
+        signer = Signer(API_KEY, PRIVATE_KEY)
+        _, seconds = timed(lambda: [signer.sign(ico) for ico in icos])
+        stages["signer"] = {"seconds": seconds, "per_ico_us": seconds / len(icos) * 10 ** 6}
+
+        latencies = []
+        samples = []
+        lock = threading.Lock()
+
+        def fetch_ico(ico):
+            params = {"ico": ico, "apiKey": API_KEY, "Hash": signer.sign(ico)}
+            start = time.perf_counter()
+            response, response_text = get_json_response(params, client, request_type)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                if response and len(samples) < SAMPLE_SIZE:
+                    samples.append(response_text)
+            return response, response_text
+
+        # end to end: read, fetch, parse and write as Component.run does
+        start = time.perf_counter()
+        fetched = 0
+        with FinstatResultWriter(os.path.join(tmp_dir, "out.csv")) as writer, \
+                FinstatResultWriter(os.path.join(tmp_dir, "bad.csv"), ["unavailable_ico"]) as bad_writer:
+            for ico, (response, _) in fetch_ordered(fetch_ico, get_icos_from_file(input_path), workers):
+                if response:
+                    writer.write(response)
+                else:
+                    bad_writer.write({"unavailable_ico": ico})
+                fetched += 1
+        end_to_end = time.perf_counter() - start
+        stages["get_json_response"] = latency_summary(latencies)
+
+        rows, seconds = timed(lambda: [parse_detail_result(text) for text in samples])
+        stages["parse_detail_result"] = {"seconds": seconds, "per_response_us": seconds / len(samples) * 10 ** 6}
+        _, seconds = timed(lambda: [parse_with_xmltodict(text) for text in samples])
+        stages["flatten_json_xmltodict"] = {"seconds": seconds, "per_response_us": seconds / len(samples) * 10 ** 6}
+
+        def write_rows():
+            with FinstatResultWriter(os.path.join(tmp_dir, "write.csv")) as write_writer:
+                write_writer.write_all(rows)
+
+        _, seconds = timed(write_rows)
+        stages["csv_write"] = {"seconds": seconds, "rows_per_second": len(rows) / seconds,
+                               "columns": len(rows[0]) if rows else 0}
+
+        requests_sent = server.request_count
+
+    return {
+        "version": APP_VERSION,
+        "python": platform.python_version(),
+        "config": {"icos": ico_count, "request_type": request_type, "workers": workers, "latency": latency,
+                   "invalid_rate": invalid_rate, "throttle_rate": throttle_rate, "error_rate": error_rate},
+        "icos_per_second": fetched / end_to_end,
+        "end_to_end_seconds": end_to_end,
+        "requests_sent": requests_sent,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": stages,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--icos", type=int, default=1000, help="number of ICOs in the input table")
+    parser.add_argument("--request-type", choices=REQUEST_TYPES, default="detail")
+    parser.add_argument("--workers", type=int, default=4, help="max_workers of the component")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds every mock request takes")
+    parser.add_argument("--invalid-rate", type=float, default=0.05, help="share of ICOs answered with 404")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--output", help="file to write the JSON results to, printed if not set")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.icos, args.request_type, args.workers, args.latency, args.invalid_rate,
+                            args.throttle_rate, args.error_rate)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
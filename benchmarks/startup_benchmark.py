@@ -0,0 +1,110 @@
+'''
+Startup time benchmark of the Finstat Extractor
+
+Imports the component in fresh interpreters, the same as a new container
+does, and prints the import time and the slowest imported modules as JSON.
+Exits with an error if a heavy dependency of a single feature is imported on startup
+or the median startup time is above the given limit.
+
+Run from the repository root with:
+    python -m benchmarks.startup_benchmark --runs 10 --max-ms 500
+'''
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "src")
+# imported only by the features that need them, never by the component module itself
+LAZY_MODULES = ["pandas", "pyarrow", "sqlite3", "multiprocessing"]
+DEFAULT_MODULE = "component"
+
+
+def parse_import_times(stderr):
+    """Reads the output of python -X importtime
+
+            Parameters:
+            stderr (string): Holds the standard error of the interpreter
+
+            Returns:
+            import_times (dict): Holds the cumulative import time of each module in microseconds
+    """
+    import_times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        import_times[module.strip()] = int(cumulative)
+    return import_times
+
+
+def measure_startup(module):
+    """Imports the module in a new interpreter
+
+            Parameters:
+            module (string): Holds the name of the module to import
+
+            Returns:
+            seconds (float): Holds the wall time of the interpreter run
+            import_times (dict): Holds the cumulative import time of each module in microseconds
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC_PATH, os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    seconds = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return seconds, parse_import_times(result.stderr)
+
+
+def run_benchmark(module, runs, top):
+    wall_times = []
+    import_times = {}
+    for _ in range(runs):
+        seconds, import_times = measure_startup(module)
+        wall_times.append(seconds)
+    # cumulative times of the last run, the time of a package includes the modules it imports
+    slowest = sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "python": platform.python_version(),
+        "module": module,
+        "runs": runs,
+        "startup_ms": {"median": statistics.median(wall_times) * 1000, "min": min(wall_times) * 1000,
+                       "max": max(wall_times) * 1000},
+        "import_ms": import_times.get(module, 0) / 1000,
+        "slowest_imports_ms": {name: micros / 1000 for name, micros in slowest},
+        "lazy_modules_imported": [name for name in LAZY_MODULES if name in import_times],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="module to import")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="number of the slowest imports listed")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if the median startup is slower")
+    parser.add_argument("--output", help="file to store the results in, printed if not set")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.module, args.runs, args.top)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+    if result["lazy_modules_imported"]:
+        sys.exit(f"Startup imports {', '.join(result['lazy_modules_imported'])}, import them where they are used")
+    if args.max_ms is not None and result["startup_ms"]["median"] > args.max_ms:
+        sys.exit(f"Median startup of {result['startup_ms']['median']:.0f} ms is above {args.max_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,7 @@ KEY_ENDPOINTS = 'endpoints'
 
 KEY_COMPANY_PROPERTIES = 'company_properties'
 KEY_DEAL_PROPERTIES = 'deal_properties'
+KEY_PREFETCH_PAGES = 'prefetch_pages'
 
 # #### Keep for debug
 KEY_STDLOG = 'stdlogging'
@@ -59,7 +60,8 @@ class Component(KBCEnvHandler):
         # ####### EXAMPLE TO REMOVE
         # intialize instance parameteres
         token = self.cfg_params[KEY_API_TOKEN]
-        self.hs_client = HubspotClient(token)
+        self.hs_client = HubspotClient(token, self.cfg_params.get(KEY_PREFETCH_PAGES,
+                                                                  hs_client.DEFAULT_PREFETCH_PAGES))
         # ####### EXAMPLE TO REMOVE END
 
     def run(self):
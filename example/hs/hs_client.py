@@ -1,4 +1,6 @@
 import json
+import queue
+import threading
 from collections.abc import Iterable
 
 from kbc.client_base import HttpClientBase
@@ -50,6 +52,11 @@ BASE_URL = 'https://api.hubapi.com/'
 
 COMPANY_PROPERTIES = 'properties/v1/companies/properties/'
 
+# number of pages fetched ahead of the page being processed, 0 fetches the pages one by one
+DEFAULT_PREFETCH_PAGES = 2
+# how often a blocked prefetch thread checks whether the consumer stopped reading
+PREFETCH_POLL_SECONDS = 0.5
+
 
 class HubspotClient(HttpClientBase):
     """
@@ -60,15 +67,23 @@ class HubspotClient(HttpClientBase):
 
     """
 
-    def __init__(self, token):
+    def __init__(self, token, prefetch_pages=DEFAULT_PREFETCH_PAGES):
+        """
+        :param token: Hubspot API key
+        :param prefetch_pages: number of pages requested in the background while the current page is processed
+        """
         HttpClientBase.__init__(self, base_url=BASE_URL, max_retries=MAX_RETRIES, backoff_factor=0.3,
                                 status_forcelist=(429, 500, 502, 504), default_params={"hapikey": token})
+        self.prefetch_pages = prefetch_pages
 
     def _get_paged_result_pages(self, endpoint, parameters, res_obj_name, limit_attr, offset_req_attr, offset_resp_attr,
                                 has_more_attr, offset, limit):
         """
         Generic pagination getter method returning Iterable instance that can be used in for loops.
 
+        The next pages are requested by a background thread while the caller processes the current one,
+        at most self.prefetch_pages pages are held in memory ahead of the caller.
+
         :param endpoint:
         :param parameters:
         :param res_obj_name:
@@ -80,6 +95,14 @@ class HubspotClient(HttpClientBase):
         :param limit:
         :return:
         """
+        pages = self._fetch_pages(endpoint, parameters, res_obj_name, limit_attr, offset_req_attr, offset_resp_attr,
+                                  has_more_attr, offset, limit)
+        if self.prefetch_pages < 1:
+            return pages
+        return _prefetch(pages, self.prefetch_pages)
+
+    def _fetch_pages(self, endpoint, parameters, res_obj_name, limit_attr, offset_req_attr, offset_resp_attr,
+                     has_more_attr, offset, limit):
         has_more = True
         while has_more:
 
@@ -87,13 +110,10 @@ class HubspotClient(HttpClientBase):
             parameters[limit_attr] = limit
 
             req = self.get_raw(self.base_url + endpoint, params=parameters)
-            resp_text = str.encode(req.text, 'utf-8')
-            req_response = json.loads(resp_text)
+            # json detects the encoding of the bytes itself, no need to decode them to text first
+            req_response = json.loads(req.content)
 
-            if req_response[has_more_attr]:
-                has_more = True
-            else:
-                has_more = False
+            has_more = bool(req_response[has_more_attr])
             offset = req_response[offset_resp_attr]
 
             yield req_response[res_obj_name]
@@ -145,3 +165,52 @@ class HubspotClient(HttpClientBase):
         else:
             return self._get_paged_result_pages(DEALS_ALL, parameters, 'deals', 'limit', 'offset', 'offset', 'hasMore',
                                                 offset, 250)
+
+
+def _prefetch(pages, depth):
+    """
+    Iterates the pages in a background thread, keeping at most depth pages ahead of the caller.
+
+    An exception raised while fetching is raised to the caller once it reaches the failed page. The thread stops
+    requesting pages when the caller closes the generator.
+
+    :param pages: iterator of the pages
+    :param depth: maximal number of pages fetched ahead
+    :return: generator of the pages in the original order
+    """
+    fetched = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                fetched.put(item, timeout=PREFETCH_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch_all():
+        try:
+            for page in pages:
+                if not put((page, None)):
+                    return
+        except Exception as e:
+            put((end, e))
+            return
+        put((end, None))
+
+    fetcher = threading.Thread(target=fetch_all, name='hubspot-prefetch', daemon=True)
+    fetcher.start()
+    try:
+        while True:
+            page, error = fetched.get()
+            if error is not None:
+                raise error
+            if page is end:
+                return
+            yield page
+    finally:
+        stopped.set()
+        fetcher.join()
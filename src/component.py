@@ -15,17 +15,86 @@ Author: Adam Bako
 import logging
 import os
 import sys
-import requests
+import concurrent.futures
+import contextlib
 import hashlib
-import xmltodict
-import pandas as pd
+import itertools
+import json
+import shutil
+import tempfile
+import time
 from datetime import datetime
 from pathlib import Path
 
 from kbc.env_handler import KBCEnvHandler
 
+from finstat.bulk import BULK_UNAVAILABLE_STATUSES, DEFAULT_BATCH_SIZE, get_bulk_endpoint, split_bulk_result
+from finstat.checkpoint import CHECKPOINT_FILE_NAME, DEFAULT_CHECKPOINT_EVERY, DEFAULT_CHECKPOINT_INTERVAL, \
+    Checkpointer
+from finstat.column_registry import ColumnRegistry
+from finstat.content_hash import SUMMARY_COLUMNS, ChangedRowsWriter, ContentHashes
+from finstat.fetcher import Deadline, PendingItems, fetch_ordered
+from finstat.finstat_client import FinstatApiError, FinstatClient, FinstatUnavailableError, INVALID_ICO_STATUSES
+from finstat.finstat_result import FinstatResultWriter, read_rows
+from finstat.ico_reader import get_ico_multiplicity, get_icos_from_file, is_valid_ico
+from finstat.incremental import DEFAULT_REFRESH_DAYS, FetchLog
+from finstat.metrics import DEFAULT_PROGRESS_INTERVAL, METRICS_FILE_NAME, METRICS_FILE_TAG, RunMetrics, \
+    count_input_rows
+from finstat.parquet_writer import DEFAULT_ROW_GROUP_SIZE, FinstatParquetWriter
+from finstat.response_archive import ARCHIVE_FILE_TAG, ResponseArchive, ResponseArchiveWriter, find_archive_files, \
+    get_archive_file_name
+from finstat.signing import Signer
+from finstat.sliced_writer import DEFAULT_SLICE_ROWS, FinstatSlicedWriter
+from finstat.throttling import DailyBudget, DailyBudgetExceeded, TokenBucket
+from finstat.xml_parser import parse_detail_result
+
 # configuration variables
-URL = "https://finstat.sk/api/"
+KEY_MAX_WORKERS = 'max_workers'
+KEY_POOL_SIZE = 'pool_size'
+KEY_REQUESTS_PER_SECOND = 'requests_per_second'
+KEY_DAILY_REQUEST_LIMIT = 'daily_request_limit'
+KEY_CACHE_TTL_DAYS = 'cache_ttl_days'
+KEY_CACHE_MAX_ENTRIES = 'cache_max_entries'
+KEY_INCREMENTAL = 'incremental'
+KEY_REFRESH_DAYS = 'refresh_days'
+KEY_CHECKPOINT_EVERY = 'checkpoint_every'
+KEY_CHECKPOINT_INTERVAL = 'checkpoint_interval'
+KEY_PROGRESS_INTERVAL = 'progress_interval'
+KEY_OUTPUT_FORMAT = 'output_format'
+KEY_PARQUET_ROW_GROUP_SIZE = 'parquet_row_group_size'
+KEY_PROCESSES = 'processes'
+KEY_KEEP_DUPLICATE_ICOS = 'keep_duplicate_icos'
+KEY_BULK_ENDPOINT = 'bulk_endpoint'
+KEY_BATCH_SIZE = 'batch_size'
+KEY_CHANGED_ONLY = 'changed_only'
+KEY_UNCHANGED_SUMMARY = 'unchanged_summary'
+KEY_SLICE_ROWS = 'slice_rows'
+KEY_SLICE_SIZE_MB = 'slice_size_mb'
+KEY_ARCHIVE_RESPONSES = 'archive_responses'
+KEY_REPLAY = 'replay'
+KEY_MAX_RUNTIME = 'max_runtime'
+KEY_PROFILE = 'profile'
+KEY_PROFILE_TOP = 'profile_top'
+
+# parameters changing which ICOs are fetched or how the output is written, a checkpoint is only resumed
+# by a run with the same values
+FINGERPRINT_PARAMS = [KEY_INCREMENTAL, KEY_REFRESH_DAYS, KEY_CHANGED_ONLY, KEY_UNCHANGED_SUMMARY,
+                      KEY_KEEP_DUPLICATE_ICOS, KEY_BULK_ENDPOINT, KEY_OUTPUT_FORMAT, KEY_ARCHIVE_RESPONSES, KEY_REPLAY,
+                      KEY_MAX_RUNTIME]
+# size of the chunks the input file is hashed in
+HASH_CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_MAX_WORKERS = 1
+DEFAULT_PROCESSES = 1
+
+BAD_ICO_COLUMNS = ["unavailable_ico"]
+# runs with several request types list the request types that did not return the ICO
+UNAVAILABLE_REQUEST_TYPES_COLUMN = "unavailable_request_types"
+RESULT_PRIMARY_KEY = ["Ico"]
+REQUEST_TYPES = ["detail", "extended", "ultimate"]
+OUTPUT_FORMATS = ["csv", "parquet", "sliced_csv"]
+PARQUET_FILE_TAG = "finstat_parquet"
+UNCHANGED_SUMMARY_FILE_NAME = "finstat-unchanged-summary.csv"
 
 # #### Keep for debug
 KEY_DEBUG = 'debug'
@@ -37,101 +106,382 @@ MANDATORY_IMAGE_PARS = []
 
 APP_VERSION = '0.1.4'
 
-def encrypt_string(hash_string):
-    """Encrypts a string with sha256
+def get_request_types(request_type):
+    """Reads the request types from the configuration
+
+        Several request types can be given as a list or as a comma separated string
+
+            Parameters:
+            request_type (string or list): Holds the configured request type
+
+            Returns:
+            request_types (list): Holds the request types without duplicates, in the configured order
+    """
+    if isinstance(request_type, str):
+        request_type = request_type.split(",")
+    request_types = []
+    for item in request_type:
+        item = str(item).strip()
+        if item and item not in request_types:
+            request_types.append(item)
+    return request_types
+
+
+def get_json_response(params, client, request_type):
+    """Uses the API to get a single response
+
+        The XML response of the API is converted to a flat row.
+        If ICO is invalid it returns False
 
             Parameters:
-            hash_string (string): Holds the string to be hashed
+            params (dict): Holds the parameters of the API call
+            client (FinstatClient): Holds the client sending the API call
+            request_type (string): Holds the API request type
 
             Returns:
-            sha_signature (string): Holds the hashed string
+            json_response (dict): Holds the flattened response
+
+            Raises:
+            FinstatApiError: If the API call failed for another reason than an invalid ICO
     """
-    sha_signature = \
-        hashlib.sha256(hash_string.encode()).hexdigest()
-    return sha_signature
+    # sending get request and saving the response as response object
+    response = client.get_detail(request_type, params)
+
+    if response.status_code == 200:
+        # If successful return the result
+        with client.metrics.timer("parse"):
+            json_response = parse_detail_result(response.text)
+        return json_response, response.text
+    elif response.status_code in INVALID_ICO_STATUSES:
+        logging.debug(f"Error : ico {params['ico']} is not a valid ico in the Finstat database")
+        return False, response.text
+    else:
+        raise FinstatApiError(f"Finstat API responded with status {response.status_code}, your API request type "
+                              f"or keys might be incorrect. Response from Finstat: {response.text}")
 
-def get_hash(api_key,private_key,ico):
-    """Creates a hash key that is needed for the api
 
-        The API defines how this key should be constructed in the API documentation
+def get_fetcher(client, cache, api_key, signer, metrics):
+    """Creates the function fetching a single request of the run
+
+        Cached responses are returned without calling the API,
+        fetched responses of valid ICOs are added to the cache
 
             Parameters:
+            client (FinstatClient): Holds the client sending the API calls
+            cache (ResponseCache): Holds the response cache, None if it is disabled
             api_key (string): The API key of the API user
-            private_key (string): The private key of the API user
-            ico (string): The ICO code of the
+            signer (Signer): Holds the signer computing the hash of the requests
+            metrics (RunMetrics): Holds the metrics of the run
 
             Returns:
-            hash_key (string): Holds the hashed key
+            fetch_ico (function): Takes an (ico, request_type) tuple, returns the flat row and the response text,
+                                  use_cache=False skips the cache lookup the caller already did
     """
-    hash_key_string = "SomeSalt+" + api_key + "+" + private_key + "++" + ico + "+ended"
-    hash_key = encrypt_string(hash_key_string)
-    return hash_key
+    def fetch_ico(request, use_cache=True):
+        ico, request_type = request
+        if not is_valid_ico(ico):
+            # a malformed ICO can not be found, it goes to the bad ICO table without spending a request
+            metrics.count("malformed_ico_requests")
+            return False, ""
+        if cache and use_cache:
+            cached_text = cache.get(ico, request_type)
+            if cached_text is not None:
+                with metrics.timer("parse"):
+                    return parse_detail_result(cached_text), cached_text
+        hash_key = signer.sign(str(ico))
+        # defining a params dict for the parameters to be sent to the API
+        params = {'ico': str(ico),
+                  "apiKey": api_key,
+                  "Hash": hash_key}
+        logging.debug(f"Getting Finstat {request_type} data for ico : {ico}")
+        response, response_text = get_json_response(params, client, request_type)
+        if response and cache:
+            cache.put(ico, request_type, response_text)
+        return response, response_text
+
+    return fetch_ico
 
 
-def flatten_json(json_dict, delim):
-    """Flattens a JSON dictionary so it can be stored in a single table row
+def get_batch_fetcher(client, cache, api_key, signer, metrics, fetch_ico, bulk_endpoint):
+    """Creates the function fetching a batch of ICOs with a single request to the bulk endpoint
+
+        ICOs missing in the bulk response are unknown to Finstat, the same as ICOs answered with 404 by
+        the single endpoint. If the bulk endpoint is not available for the account, the batches are fetched
+        with single requests for the rest of the run, so the outputs are the same as without batching.
 
             Parameters:
-            json_dict (dict): Holds the json data
-            delim (string): The delimiter to be used to create flattened keys
+            client (FinstatClient): Holds the client sending the API calls
+            cache (ResponseCache): Holds the response cache, None if it is disabled
+            api_key (string): The API key of the API user
+            signer (Signer): Holds the signer computing the hash of the requests
+            metrics (RunMetrics): Holds the metrics of the run
+            fetch_ico (function): Holds the single request fetcher created by get_fetcher
+            bulk_endpoint (string): Holds the path of the bulk endpoint, see finstat.bulk.get_bulk_endpoint
 
             Returns:
-            flattened_dict (dict): Holds the flattened dictionary
+            fetch_batch (function): Takes an (icos, request_type) tuple, returns the flat rows and response texts
+                                    of the ICOs in the same order
     """
-    flattened_dict = {}
-    for i in json_dict.keys():
-        if isinstance(json_dict[i], dict):
-            get = flatten_json(json_dict[i], delim)
-            for j in get.keys():
-                flattened_dict[i + delim + j] = get[j]
-        else:
-            flattened_dict[i] = json_dict[i]
+    bulk = {"available": True}
 
-    return flattened_dict
+    def fetch_batch(batch):
+        icos, request_type = batch
+        results = {}
+        missing = []
+        if bulk["available"]:
+            for ico in icos:
+                cached_text = cache.get(ico, request_type) if cache and is_valid_ico(ico) else None
+                if cached_text is not None:
+                    with metrics.timer("parse"):
+                        results[ico] = parse_detail_result(cached_text), cached_text
+                elif is_valid_ico(ico):
+                    missing.append(ico)
+            if missing:
+                results.update(fetch_bulk(missing, request_type))
+        # malformed ICOs and the ICOs of failed bulk requests, the ICOs missed in the cache are not looked up again
+        cache_misses = set(missing)
+        for ico in icos:
+            if ico not in results:
+                results[ico] = fetch_ico((ico, request_type), use_cache=ico not in cache_misses)
+        return [results[ico] for ico in icos]
 
-def get_json_response(params,url,request_type):
-    """Uses the API to get a single response
+    def fetch_bulk(icos, request_type):
+        ico_list = ",".join(icos)
+        params = {'ico': ico_list,
+                  "apiKey": api_key,
+                  "Hash": signer.sign(ico_list)}
+        logging.debug(f"Getting Finstat {request_type} data for {len(icos)} icos")
+        response = client.get_detail(get_bulk_endpoint(bulk_endpoint, request_type), params)
+        if response.status_code in BULK_UNAVAILABLE_STATUSES:
+            if bulk["available"]:
+                bulk["available"] = False
+                logging.warning(f"The bulk endpoint responded with status {response.status_code}, "
+                                f"the ICOs are fetched one by one")
+            return {}
+        if response.status_code != 200:
+            logging.debug(f"Bulk request failed with status {response.status_code}, fetching the icos one by one")
+            return {}
+        metrics.count("bulk_requests")
+        with metrics.timer("parse"):
+            responses = split_bulk_result(response.text)
+            results = {}
+            for ico in icos:
+                response_text = responses.get(ico)
+                results[ico] = (parse_detail_result(response_text), response_text) if response_text \
+                    else (False, response.text)
+        if cache:
+            for ico, (row, response_text) in results.items():
+                if row:
+                    cache.put(ico, request_type, response_text)
+        return results
+
+    return fetch_batch
 
-        The XML response of the API is converted to JSON.
-        If ICO is invalid it returns False
+
+def get_archive_fetcher(archive, metrics):
+    """Creates the function reading a single response from the archives of previous runs instead of the API
 
             Parameters:
-            params (dict): Holds the parameters of the API call
+            archive (ResponseArchive): Holds the archived responses
+            metrics (RunMetrics): Holds the metrics of the run
 
             Returns:
-            json_response (dict): Holds the JSON response
+            fetch_ico (function): Takes an (ico, request_type) tuple, returns the flat row and the response text
     """
-    # sending get request and saving the response as response object
-    response = requests.get(url=url+request_type, params=params)
+    def fetch_ico(request):
+        ico, request_type = request
+        response_text = archive.get(ico, request_type)
+        if response_text is None:
+            # ICOs without an archived response go to the bad ICO table, the same as ICOs unknown to Finstat
+            metrics.count("archive_misses")
+            return False, ""
+        with metrics.timer("parse"):
+            return parse_detail_result(response_text), response_text
 
-    if response.status_code == 200:
-        # If successful return the result
-        json_response = dict(xmltodict.parse(response.text)["DetailResult"])
-        return json_response, response.text
-    else:
-        logging.info(f"Error : ico {params['ico']} is not a valid ico in the Finstat database")
-        return False , response.text
+    return fetch_ico
 
 
-def get_icos_from_file(filepath):
-    """Retrieves ICOs to be fetched from a CSV file
+def fetch_responses(icos, request_types, fetch_ico, max_workers, fetch_batch=None, batch_size=1, deadline=None):
+    """Fetches all request types of the ICOs with the shared workers
 
-        First looks for an ico column, if this does not exist,
-        it takes the first column in the csv file
+        Once the deadline passes no new ICOs are taken from the icos iterator, the requests
+        already sent are still returned, so the ICOs left in the iterator are the unprocessed ones.
 
             Parameters:
-            filepath (string): Holds the path to the csv file
+            icos (iterator): Holds the ICOs to fetch
+            request_types (list): Holds the request types fetched for every ICO
+            fetch_ico (function): Holds the single request fetcher created by get_fetcher
+            max_workers (int): Holds the number of requests sent at once
+            fetch_batch (function): Holds the batch fetcher created by get_batch_fetcher, None without batching
+            batch_size (int): Holds the number of ICOs fetched by one batch
+            deadline (Deadline): Holds the time after which no new ICOs are fetched, None for no limit
 
             Returns:
-            icos (list): Holds a list of ICO form the file
+            responses (iterator): Yields ((ico, request_type), (response, response_text)) tuples in input order
     """
-    ico_df = pd.read_csv(filepath)
-    cols = ico_df.columns
-    if "ico" in cols :
-        icos = list(ico_df["ico"])
+    if deadline:
+        icos = deadline.until(icos)
+    if fetch_batch is None:
+        # every request type of an ICO is a separate task, so all of them share the workers and connections
+        requests = ((ico, request_type) for ico in icos for request_type in request_types)
+        return fetch_ordered(fetch_ico, requests, max_workers)
+    return _fetch_batched(iter(icos), request_types, fetch_batch, max_workers, batch_size)
+
+
+def _fetch_batched(icos, request_types, fetch_batch, max_workers, batch_size):
+    batches = iter(lambda: list(itertools.islice(icos, batch_size)), [])
+    tasks = ((batch, request_type) for batch in batches for request_type in request_types)
+    batch_results = {}
+    for (batch, request_type), results in fetch_ordered(fetch_batch, tasks, max_workers):
+        batch_results[request_type] = results
+        if request_type != request_types[-1]:
+            continue
+        for index, ico in enumerate(batch):
+            for batch_request_type in request_types:
+                yield (ico, batch_request_type), batch_results[batch_request_type][index]
+        batch_results = {}
+
+
+def write_responses(responses, request_types, result_writers, bad_ico_writer, fetch_log, metrics,
+                    multiplicity=None, archive=None):
+    """Writes the fetched responses to the output files
+
+        The responses of an ICO come one request type after another. The ICO is recorded as fetched
+        when all request types returned it, otherwise it is written to the bad ICO table, with the request
+        types that did not return it when the run has several.
+
+            Parameters:
+            responses (iterator): Holds ((ico, request_type), (response, response_text)) tuples in input order
+            request_types (list): Holds the request types fetched for every ICO
+            result_writers (dict): Holds the result writer of each request type
+            bad_ico_writer (FinstatResultWriter): Holds the writer of the bad ICO table
+            fetch_log (FetchLog): Holds the successfully fetched ICOs
+            metrics (RunMetrics): Holds the metrics of the run
+            multiplicity (dict): Holds the number of input rows of the repeated ICOs, their rows are written
+                                 that many times
+            archive (ResponseArchiveWriter): Holds the archive the raw responses are written to, None if disabled
+
+            Yields:
+            ico, response_text: Each ICO once all of its responses are written, with the last response text
+    """
+    last_request_type = request_types[-1]
+    missing_types = []
+    for (ico, request_type), (response, response_text) in responses:
+        if response:
+            with metrics.timer("write"):
+                for _ in range(multiplicity.get(ico, 1) if multiplicity else 1):
+                    result_writers[request_type].write(response)
+                if archive:
+                    archive.add(ico, request_type, response_text)
+        else:
+            missing_types.append(request_type)
+        if request_type != last_request_type:
+            continue
+        with metrics.timer("write"):
+            if not missing_types:
+                fetch_log.record(ico)
+            elif len(request_types) == 1:
+                bad_ico_writer.write({"unavailable_ico": ico})
+            else:
+                bad_ico_writer.write({"unavailable_ico": ico,
+                                      UNAVAILABLE_REQUEST_TYPES_COLUMN: ",".join(missing_types)})
+        metrics.ico_processed(len(missing_types) < len(request_types))
+        missing_types = []
+        yield ico, response_text
+
+
+def fetch_shard(shard):
+    """Fetches one shard of the input ICOs, run in a separate process
+
+        The shard takes every n-th ICO of the input and writes csv slices of the outputs,
+        which are merged by the run when all shards are done. The rate limit and the daily
+        budget of the run are split between the shards.
+
+            Parameters:
+            shard (dict): Holds the shard index, the paths of its slices and the run settings
+
+            Returns:
+            result (dict): Holds the rows and columns of the slices, the fetched ICOs, the used requests
+                           and the metrics of the shard
+    """
+    metrics = RunMetrics(shard["total_estimate"], shard["progress_interval"])
+    daily_budget = DailyBudget(shard["daily_request_limit"])
+    rate_limiter = TokenBucket(shard["requests_per_second"]) if shard["requests_per_second"] else None
+    fetch_log = FetchLog(shard["fetched_icos"], shard["refresh_days"])
+
+    icos = itertools.islice(get_icos_from_file(shard["source_file_path"]), shard["index"], None, shard["count"])
+    if shard["unprocessed_icos"]:
+        icos = filter(set(shard["unprocessed_icos"]).__contains__, icos)
+    if shard["incremental"]:
+        icos = filter(fetch_log.needs_fetch, icos)
+    deadline = Deadline(shard["deadline"]) if shard["deadline"] else None
+    # the ICOs left when the shard stops at the deadline or the daily limit are fetched by the next run
+    icos = PendingItems(icos)
+    unprocessed = []
+    api_error = None
+    request_types = shard["request_types"]
+
+    client = FinstatClient(pool_size=shard["pool_size"], rate_limiter=rate_limiter, daily_budget=daily_budget,
+                           metrics=metrics)
+    cache = None
+    if shard["cache_path"]:
+        from finstat.response_cache import ResponseCache
+        cache = ResponseCache(shard["cache_path"], shard["cache_ttl_seconds"], shared=True)
+    replay_archive = ResponseArchive(shard["replay_paths"]) if shard["replay_paths"] else None
+    if replay_archive:
+        fetch_ico = get_archive_fetcher(replay_archive, metrics)
+        fetch_batch = None
     else:
-        icos = list(ico_df[cols[0]])
-    return icos
+        signer = Signer(shard["api_key"], shard["private_key"])
+        fetch_ico = get_fetcher(client, cache, shard["api_key"], signer, metrics)
+        fetch_batch = get_batch_fetcher(client, cache, shard["api_key"], signer, metrics, fetch_ico,
+                                        shard["bulk_endpoint"]) if shard["bulk_endpoint"] else None
+    archive = ResponseArchiveWriter(shard["archive_path"]) if shard["archive_path"] else None
+    result_writers = {request_type: FinstatResultWriter(slice_path, shard["columns"].get(request_type))
+                      for request_type, slice_path in shard["slice_paths"].items()}
+    bad_ico_writer = FinstatResultWriter(shard["bad_ico_slice_path"], BAD_ICO_COLUMNS)
+    response_text = ""
+    try:
+        with contextlib.ExitStack() as writers:
+            writers.enter_context(client)
+            for result_writer in result_writers.values():
+                writers.enter_context(result_writer)
+            writers.enter_context(bad_ico_writer)
+            if replay_archive:
+                writers.enter_context(replay_archive)
+            if archive:
+                writers.enter_context(archive)
+            responses = fetch_responses(icos, request_types, fetch_ico, shard["max_workers"], fetch_batch,
+                                        shard["batch_size"], deadline)
+            for ico, response_text in write_responses(responses, request_types, result_writers, bad_ico_writer,
+                                                      fetch_log, metrics, shard["multiplicity"], archive):
+                icos.done()
+            if deadline and deadline.passed:
+                logging.warning(f"Shard {shard['index']} reached the max runtime")
+                unprocessed = icos.remaining()
+    except DailyBudgetExceeded as error:
+        logging.warning(f"{error}, the remaining ICOs of shard {shard['index']} are fetched by the next run")
+        unprocessed = icos.remaining()
+    except FinstatUnavailableError as error:
+        api_error = str(error)
+        unprocessed = icos.remaining()
+    finally:
+        if cache:
+            cache.close()
+    if archive:
+        metrics.count("archived_responses", archive.count)
+    return {"rows_written": {request_type: result_writer.rows_written
+                             for request_type, result_writer in result_writers.items()},
+            "fetched_icos": fetch_log.recorded,
+            "skipped": fetch_log.skipped,
+            "requests_used": daily_budget.used,
+            "cache_hits": cache.hits if cache else 0,
+            "cache_misses": cache.misses if cache else 0,
+            "counters": metrics.counters,
+            "stages": metrics.stages,
+            "unprocessed_icos": unprocessed,
+            "api_error": api_error,
+            "response_text": response_text}
 
 
 class Component(KBCEnvHandler):
@@ -163,85 +513,508 @@ class Component(KBCEnvHandler):
         #
         #         # ####### EXAMPLE TO REMOVE END
 
+    def _get_positive_param(self, key, default, param_type=int):
+        """
+        Reads an optional positive number parameter, exits with a readable message if it is invalid
+        """
+        value = self.cfg_params.get(key)
+        if value in (None, ""):
+            return default
+        try:
+            value = param_type(value)
+        except (TypeError, ValueError):
+            value = 0
+        if value <= 0:
+            logging.error(f'The {key} parameter has to be a positive '
+                          f'{"whole number" if param_type is int else "number"}')
+            exit(1)
+        return value
+
+    def _open_response_cache(self, ttl_days, max_entries):
+        """
+        Opens the response cache, continuing from the cache file of the previous run if it is in the input files.
+
+        The cache file is stored in the output files with the CACHE_FILE_TAG tag, the next run picks it up
+        when the tag is set in the file input mapping.
+        """
+        # sqlite is only loaded by the runs using the cache
+        from finstat.response_cache import CACHE_FILE_NAME, CACHE_FILE_TAG, DEFAULT_MAX_ENTRIES, ResponseCache, \
+            find_cache_file
+
+        cache_path = os.path.join(self.files_out_path, CACHE_FILE_NAME)
+        previous_cache_path = find_cache_file(self.files_in_path)
+        if previous_cache_path:
+            logging.info(f"Continuing with cached responses from {os.path.basename(previous_cache_path)}")
+            shutil.copyfile(previous_cache_path, cache_path)
+        self.configuration.write_file_manifest(cache_path, file_tags=[CACHE_FILE_TAG], is_permanent=False)
+        return ResponseCache(cache_path, ttl_days * 24 * 60 * 60, max_entries or DEFAULT_MAX_ENTRIES)
+
+    def _write_table_manifest(self, file_path, primary_key, incremental, columns=None):
+        """
+        Writes the manifest of an output table, with the primary key only for incremental loads.
+
+        Sliced tables have no header, their columns are listed in the manifest.
+        """
+        if incremental:
+            self.configuration.write_table_manifest(file_name=file_path, primary_key=primary_key, incremental=True,
+                                                    columns=columns)
+        else:
+            self.configuration.write_table_manifest(file_name=file_path, columns=columns)
+
+    def _get_run_fingerprint(self, source_file_path, request_types, unprocessed_icos):
+        """
+        Identifies the configuration and input of a run, a checkpoint is only resumed by a run with the same one
+        """
+        input_hash = hashlib.sha256()
+        with open(source_file_path, 'rb') as source_file:
+            for chunk in iter(lambda: source_file.read(HASH_CHUNK_SIZE), b''):
+                input_hash.update(chunk)
+        fingerprint = {"request_types": request_types,
+                       "params": {key: self.cfg_params.get(key) for key in FINGERPRINT_PARAMS},
+                       "unprocessed_icos": unprocessed_icos,
+                       "input": input_hash.hexdigest()}
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+    def _fetch_shards(self, shard_settings, daily_budget, result_writers, bad_ico_writer, fetch_log, metrics,
+                      cache):
+        """
+        Fetches the ICOs in separate processes and merges their csv slices into the writers of the run.
+
+        :return: the last response text of the shards, the ICOs the shards left unprocessed and the error
+                 of the first shard stopped by a Finstat outage
+        """
+        shard_count = shard_settings["count"]
+        # the requests left for today are split evenly between the shards
+        remaining = None if daily_budget.limit is None else max(0, daily_budget.limit - daily_budget.used)
+        response_text = ""
+        unprocessed = []
+        api_error = None
+        with tempfile.TemporaryDirectory(dir=self.data_path) as slice_folder:
+            shards = []
+            for index in range(shard_count):
+                shards.append(dict(shard_settings,
+                                   index=index,
+                                   daily_request_limit=None if remaining is None
+                                   else remaining // shard_count + (index < remaining % shard_count),
+                                   slice_paths={request_type: os.path.join(slice_folder, f"{request_type}-{index}.csv")
+                                                for request_type in result_writers},
+                                   bad_ico_slice_path=os.path.join(slice_folder, f"bad-ico-{index}.csv"),
+                                   archive_path=shard_settings["archive_folder"] and os.path.join(
+                                       shard_settings["archive_folder"], get_archive_file_name(index))))
+            logging.info(f"Fetching the ICOs in {shard_count} processes")
+            with concurrent.futures.ProcessPoolExecutor(shard_count) as executor:
+                shard_results = list(executor.map(fetch_shard, shards))
+            for shard, result in zip(shards, shard_results):
+                for request_type, result_writer in result_writers.items():
+                    if result["rows_written"][request_type]:
+                        with metrics.timer("merge"):
+                            result_writer.write_all(read_rows(shard["slice_paths"][request_type]))
+                if os.path.getsize(shard["bad_ico_slice_path"]):
+                    bad_ico_writer.write_all(read_rows(shard["bad_ico_slice_path"]))
+                fetch_log.recorded.update(result["fetched_icos"])
+                fetch_log.skipped += result["skipped"]
+                daily_budget.used += result["requests_used"]
+                metrics.merge(result["counters"], result["stages"])
+                if cache:
+                    cache.hits += result["cache_hits"]
+                    cache.misses += result["cache_misses"]
+                response_text = result["response_text"] or response_text
+                unprocessed.extend(result["unprocessed_icos"])
+                api_error = api_error or result["api_error"]
+        return response_text, unprocessed, api_error
+
     def run(self):
         '''
-        Main execution code
+        Main execution code, profiled when the profile parameter is set
         '''
-        params = self.cfg_params  # noqa
+        if not self.cfg_params.get(KEY_PROFILE):
+            return self._run()
+        # the profiler is only loaded by the profiled runs
+        from finstat.profiling import DEFAULT_TOP, PROFILE_FILE_TAG, RunProfiler
 
-        current_datetime = str(datetime.now().now())\
-            .replace(" ", "-")\
-            .replace(":", "-")\
-            .split(".")[0]
+        profiler = RunProfiler(self._get_positive_param(KEY_PROFILE_TOP, DEFAULT_TOP))
+        logging.info("Profiling the run, it is slower than usual")
+        profiler.start()
+        try:
+            return self._run()
+        finally:
+            # written for failed runs too, which helps local runs, Keboola does not upload the files of failed jobs
+            profiler.stop()
+            for profile_path in profiler.write(self.files_out_path):
+                self.configuration.write_file_manifest(profile_path, file_tags=[PROFILE_FILE_TAG],
+                                                       is_permanent=False)
+            logging.info(f"Profile of the run written to the output files with the {PROFILE_FILE_TAG} tag")
 
-        response_filename = "finstat-out-"+current_datetime+'.csv'
-        bad_ico_filename = "finstat-bad-ico-out-" + current_datetime + '.csv'
+    def _run(self):
+        run_started = time.time()
+        params = self.cfg_params  # noqa
 
         SOURCE_FILE_PATH = self.get_input_tables_definitions()[0].full_path
-        RESULT_FILE_PATH = os.path.join(self.tables_out_path, response_filename)
-        NO_RESULT_FILE_PATH = os.path.join(self.tables_out_path, bad_ico_filename)
 
         PARAM_API_KEY = params['#api_key']
         PARAM_PRIVATE_KEY = params['#private_key']
-        PARAM_REQUEST_TYPE = params['request_type']
+        PARAM_REQUEST_TYPES = get_request_types(params['request_type'])
 
-        if PARAM_REQUEST_TYPE not in ["detail","extended","ultimate"]:
+        if not PARAM_REQUEST_TYPES or any(request_type not in REQUEST_TYPES for request_type in PARAM_REQUEST_TYPES):
             logging.error('Your API request type is not available, choose from the list'
                           ' : detail, extended, ultimate')
             exit(1)
 
-        #  make manifest file for output, set primary key and incremental load
-        self.configuration.write_table_manifest(file_name=RESULT_FILE_PATH)
-        self.configuration.write_table_manifest(file_name=NO_RESULT_FILE_PATH)
+        incremental = bool(params.get(KEY_INCREMENTAL))
+        replay = bool(params.get(KEY_REPLAY))
+        # a replay rebuilds the tables from archived responses, which are not archived again
+        archive_responses = bool(params.get(KEY_ARCHIVE_RESPONSES)) and not replay
+        # a replay rebuilds all ICOs, the fetch dates of the incremental runs are kept as they are
+        skip_fetched = incremental and not replay
+        changed_only = bool(params.get(KEY_CHANGED_ONLY))
+        unchanged_summary = changed_only and bool(params.get(KEY_UNCHANGED_SUMMARY))
+        # only part of the rows is written in both modes, so the tables are loaded incrementally
+        incremental_load = incremental or changed_only
+        max_workers = self._get_positive_param(KEY_MAX_WORKERS, DEFAULT_MAX_WORKERS)
+        pool_size = self._get_positive_param(KEY_POOL_SIZE, max_workers)
+        requests_per_second = self._get_positive_param(KEY_REQUESTS_PER_SECOND, None, float)
+        daily_request_limit = self._get_positive_param(KEY_DAILY_REQUEST_LIMIT, None)
+        cache_ttl_days = self._get_positive_param(KEY_CACHE_TTL_DAYS, None, float)
+        cache_max_entries = self._get_positive_param(KEY_CACHE_MAX_ENTRIES, None)
+        refresh_days = self._get_positive_param(KEY_REFRESH_DAYS, DEFAULT_REFRESH_DAYS, float)
+        checkpoint_every = self._get_positive_param(KEY_CHECKPOINT_EVERY, DEFAULT_CHECKPOINT_EVERY)
+        checkpoint_interval = self._get_positive_param(KEY_CHECKPOINT_INTERVAL, DEFAULT_CHECKPOINT_INTERVAL, float)
+        progress_interval = self._get_positive_param(KEY_PROGRESS_INTERVAL, DEFAULT_PROGRESS_INTERVAL, float)
+        row_group_size = self._get_positive_param(KEY_PARQUET_ROW_GROUP_SIZE, DEFAULT_ROW_GROUP_SIZE)
+        # a replay only parses, it uses all cores unless set otherwise
+        processes = self._get_positive_param(KEY_PROCESSES, os.cpu_count() or 1 if replay else DEFAULT_PROCESSES)
+        keep_duplicate_icos = bool(params.get(KEY_KEEP_DUPLICATE_ICOS))
+        bulk_endpoint = (params.get(KEY_BULK_ENDPOINT) or "").strip("/ ")
+        batch_size = self._get_positive_param(KEY_BATCH_SIZE, DEFAULT_BATCH_SIZE)
+        max_runtime = self._get_positive_param(KEY_MAX_RUNTIME, None, float)
+        # no new ICOs are fetched after the deadline, the run writes what it has and leaves the rest for the next one
+        deadline = Deadline(run_started + max_runtime) if max_runtime else None
+        output_format = params.get(KEY_OUTPUT_FORMAT) or "csv"
+        if output_format not in OUTPUT_FORMATS:
+            logging.error('Your output format is not available, choose from the list : csv, parquet, sliced_csv')
+            exit(1)
+        sliced = output_format == "sliced_csv"
+        slice_rows = self._get_positive_param(KEY_SLICE_ROWS, DEFAULT_SLICE_ROWS)
+        slice_size_mb = self._get_positive_param(KEY_SLICE_SIZE_MB, None, float)
+        slice_max_bytes = slice_size_mb and int(slice_size_mb * 1024 * 1024)
+        # parquet files and compressed slices can not be appended to and the shards are not checkpointed,
+        # such runs always start over
+        checkpoints_enabled = output_format == "csv" and processes == 1
 
         logging.info('Running ....')
-        try:
-            f = open(SOURCE_FILE_PATH)
-        except IOError:
+        if not os.path.isfile(SOURCE_FILE_PATH):
             logging.error('Your input ICO file is not accessible,'
-                         ' make sure it is added in the input mapping')
+                          ' make sure it is added in the input mapping')
             exit(1)
 
-        icos = get_icos_from_file(SOURCE_FILE_PATH)
-        json_responses = []
-        bad_ico = []
+        replay_paths = find_archive_files(self.files_in_path) if replay else []
+        if replay and not replay_paths:
+            logging.error(f'The replay needs the archived responses of a previous run, add the files '
+                          f'with the {ARCHIVE_FILE_TAG} tag to the file input mapping')
+            exit(1)
 
-        for ico in icos:
-            hash_key = get_hash(PARAM_API_KEY, PARAM_PRIVATE_KEY, str(ico))
-            # defining a params dict for the parameters to be sent to the API
-            PARAMS = {'ico': str(ico),
-                      "apiKey": PARAM_API_KEY,
-                      "Hash": hash_key}
-            logging.info(f"Getting Finstat data for ico : {ico}")
-            response, response_text = get_json_response(PARAMS,URL,PARAM_REQUEST_TYPE)
-            if response:
-                json_responses.append(response)
+        checkpointer = Checkpointer(os.path.join(self.data_path, CHECKPOINT_FILE_NAME),
+                                    self._get_run_fingerprint(SOURCE_FILE_PATH, PARAM_REQUEST_TYPES,
+                                                              self.get_state_file().get("unprocessed_icos")),
+                                    checkpoint_every, checkpoint_interval)
+        checkpoint = checkpointer.load() if checkpoints_enabled else None
+        if checkpoint:
+            logging.info(f"Resuming the previous run after {checkpoint['offset']} ICOs")
+            response_filenames = checkpoint["response_filenames"]
+            bad_ico_filename = checkpoint["bad_ico_filename"]
+        else:
+            file_extension = "parquet" if output_format == "parquet" else "csv"
+            if incremental_load:
+                # incremental loads need the same table names in every run
+                file_suffix = "." + file_extension
+                bad_ico_filename = "finstat-bad-ico-out.csv"
             else:
-                bad_ico.append({"unavailable_ico": ico})
+                current_datetime = str(datetime.now().now())\
+                    .replace(" ", "-")\
+                    .replace(":", "-")\
+                    .split(".")[0]
+                file_suffix = "-" + current_datetime + "." + file_extension
+                bad_ico_filename = "finstat-bad-ico-out-" + current_datetime + '.csv'
+            # a single request type keeps the table name without the type
+            response_filenames = {request_type: "finstat-out" + file_suffix if len(PARAM_REQUEST_TYPES) == 1
+                                  else "finstat-" + request_type + "-out" + file_suffix
+                                  for request_type in PARAM_REQUEST_TYPES}
+
+        # parquet is not a storage table format, the result is stored in the output files
+        result_path = self.files_out_path if output_format == "parquet" else self.tables_out_path
+        RESULT_FILE_PATHS = {request_type: os.path.join(result_path, response_filename)
+                             for request_type, response_filename in response_filenames.items()}
+        NO_RESULT_FILE_PATH = os.path.join(self.tables_out_path, bad_ico_filename)
+
+        #  make manifest file for output, set primary key and incremental load
+        #  the manifests of sliced tables list the columns, they are written once the columns are known
+        for result_file_path in RESULT_FILE_PATHS.values() if output_format == "csv" else []:
+            self._write_table_manifest(result_file_path, RESULT_PRIMARY_KEY, incremental_load)
+        if not sliced:
+            self._write_table_manifest(NO_RESULT_FILE_PATH, BAD_ICO_COLUMNS, incremental_load)
+
+        previous_state = self.get_state_file()
+        used_budget = previous_state.get("daily_budget", {})
+        daily_budget = DailyBudget(daily_request_limit, used_budget.get("day"), used_budget.get("used", 0))
+        rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+
+        # the columns of the previous runs give the writers their header up front
+        column_registry = ColumnRegistry(previous_state.get("columns"))
 
-        for i, response in enumerate(json_responses):
-            json_responses[i] = flatten_json(json_responses[i], "__")
+        fetch_log = FetchLog(previous_state.get("fetched_icos") if skip_fetched else None, refresh_days,
+                             recorded=checkpoint["fetched_icos"] if checkpoint else None)
 
-        if len(json_responses) > 0:
-            response_df = pd.DataFrame.from_records(json_responses)
-            response_df.to_csv(RESULT_FILE_PATH, index=False)
-            bad_ico_df = pd.DataFrame.from_records(bad_ico)
-            bad_ico_df.to_csv(NO_RESULT_FILE_PATH, index=False)
+        icos = get_icos_from_file(SOURCE_FILE_PATH)
+        # a run stopped at the max runtime left the rest of its ICOs for this one
+        unprocessed_icos = previous_state.get("unprocessed_icos")
+        if unprocessed_icos:
+            remaining = set(unprocessed_icos)
+            if any(ico in remaining for ico in get_icos_from_file(SOURCE_FILE_PATH)):
+                logging.info(f"Continuing with the {len(unprocessed_icos)} ICOs the previous run did not process")
+                icos = filter(remaining.__contains__, icos)
+            else:
+                logging.info("None of the ICOs the previous run did not process are in the input anymore, "
+                             "fetching the whole input")
+                unprocessed_icos = None
+        # repeated ICOs are fetched once, their rows are repeated in the result if the input rows should be kept
+        multiplicity = get_ico_multiplicity(SOURCE_FILE_PATH) if keep_duplicate_icos else None
+        if skip_fetched:
+            icos = filter(fetch_log.needs_fetch, icos)
+        offset = checkpoint["offset"] if checkpoint else 0
+        icos = itertools.islice(icos, offset, None)
+        response_text = ""
+        input_rows = len(unprocessed_icos) if unprocessed_icos else count_input_rows(SOURCE_FILE_PATH)
+        metrics = RunMetrics(max(0, input_rows - offset), progress_interval)
+        client = FinstatClient(pool_size=pool_size, rate_limiter=rate_limiter, daily_budget=daily_budget,
+                               metrics=metrics)
+        cache = self._open_response_cache(cache_ttl_days, cache_max_entries) if cache_ttl_days and not replay \
+            else None
+        replay_archive = None
+        if replay:
+            replay_archive = ResponseArchive(replay_paths)
+            logging.info(f"Replaying {len(replay_archive)} archived responses from {len(replay_paths)} files, "
+                         f"the API is not called")
+            fetch_ico = get_archive_fetcher(replay_archive, metrics)
+            fetch_batch = None
+        else:
+            # the signer is created once per run, it hashes the constant part of the signature only once
+            signer = Signer(PARAM_API_KEY, PARAM_PRIVATE_KEY)
+            fetch_ico = get_fetcher(client, cache, PARAM_API_KEY, signer, metrics)
+            fetch_batch = get_batch_fetcher(client, cache, PARAM_API_KEY, signer, metrics, fetch_ico,
+                                            bulk_endpoint) if bulk_endpoint else None
+        archive = None
+        archive_paths = []
+        if archive_responses and processes == 1:
+            archive_paths = [os.path.join(self.files_out_path, get_archive_file_name())]
+            # a resumed run keeps the responses archived before the checkpoint
+            archive = ResponseArchiveWriter(archive_paths[0], append=bool(checkpoint))
+        elif archive_responses:
+            archive_paths = [os.path.join(self.files_out_path, get_archive_file_name(index))
+                             for index in range(processes)]
+
+        # rows are written as they arrive, the writers are closed with the rows fetched so far on failure
+        result_writers = {}
+        for request_type, result_file_path in RESULT_FILE_PATHS.items():
+            known_columns = column_registry.columns(request_type)
+            if output_format == "parquet":
+                try:
+                    result_writers[request_type] = FinstatParquetWriter(result_file_path, known_columns,
+                                                                        row_group_size=row_group_size)
+                except ImportError as error:
+                    logging.error(error)
+                    exit(1)
+            elif sliced:
+                result_writers[request_type] = FinstatSlicedWriter(result_file_path, known_columns, slice_rows,
+                                                                   slice_max_bytes)
+            else:
+                result_writers[request_type] = FinstatResultWriter(
+                    result_file_path, known_columns, resume=checkpoint and checkpoint["results"][request_type])
+        content_hashes = None
+        if changed_only:
+            # the rows are hashed as they are written, only new and changed rows reach the writers
+            content_hashes = ContentHashes(previous_state.get("content_hashes"),
+                                           checkpoint and checkpoint.get("content_hashes"))
+            result_writers = {request_type: ChangedRowsWriter(result_writer, content_hashes, request_type)
+                              for request_type, result_writer in result_writers.items()}
+        if sliced:
+            bad_ico_writer = FinstatSlicedWriter(NO_RESULT_FILE_PATH, BAD_ICO_COLUMNS, slice_rows, slice_max_bytes)
         else:
-            logging.error(f"Error : No output. "
-                         f"Your API request type or keys might be incorrect or"
-                         f" all ICO inputs are invalid")
-            logging.info(f"Response from Finstat:" + response_text)
+            bad_ico_writer = FinstatResultWriter(NO_RESULT_FILE_PATH, BAD_ICO_COLUMNS,
+                                                 resume=checkpoint and checkpoint["bad_ico"])
+        unprocessed = []
+        api_error = None
+        try:
+            with contextlib.ExitStack() as writers:
+                writers.enter_context(client)
+                for result_writer in result_writers.values():
+                    writers.enter_context(result_writer)
+                writers.enter_context(bad_ico_writer)
+                if replay_archive:
+                    writers.enter_context(replay_archive)
+                if archive:
+                    writers.enter_context(archive)
+                if processes > 1:
+                    shard_settings = {"source_file_path": SOURCE_FILE_PATH,
+                                      "count": processes,
+                                      "api_key": PARAM_API_KEY,
+                                      "private_key": PARAM_PRIVATE_KEY,
+                                      "request_types": PARAM_REQUEST_TYPES,
+                                      "columns": column_registry.to_state(),
+                                      "incremental": skip_fetched,
+                                      "fetched_icos": fetch_log.fetched,
+                                      "multiplicity": multiplicity,
+                                      "bulk_endpoint": bulk_endpoint,
+                                      "replay_paths": replay_paths,
+                                      "unprocessed_icos": unprocessed_icos,
+                                      "deadline": deadline and deadline.at,
+                                      "archive_folder": archive_responses and self.files_out_path,
+                                      "batch_size": batch_size,
+                                      "refresh_days": refresh_days,
+                                      "max_workers": max_workers,
+                                      "pool_size": pool_size,
+                                      "requests_per_second": requests_per_second and requests_per_second / processes,
+                                      "cache_path": cache and cache.path,
+                                      "cache_ttl_seconds": cache and cache.ttl_seconds,
+                                      "total_estimate": metrics.total_estimate // processes,
+                                      "progress_interval": progress_interval}
+                    response_text, unprocessed, api_error = self._fetch_shards(
+                        shard_settings, daily_budget, result_writers, bad_ico_writer, fetch_log, metrics, cache)
+                else:
+                    # the ICOs left when the run stops at the deadline or the daily limit are fetched by the next run
+                    icos = PendingItems(icos)
+                    responses = fetch_responses(icos, PARAM_REQUEST_TYPES, fetch_ico, max_workers, fetch_batch,
+                                                batch_size, deadline)
+                    for ico, response_text in write_responses(responses, PARAM_REQUEST_TYPES, result_writers,
+                                                              bad_ico_writer, fetch_log, metrics, multiplicity,
+                                                              archive):
+                        icos.done()
+                        offset += 1
+                        if checkpoints_enabled and checkpointer.is_due(offset):
+                            checkpointer.save(offset, response_filenames=response_filenames,
+                                              bad_ico_filename=bad_ico_filename,
+                                              results={request_type: result_writer.checkpoint()
+                                                       for request_type, result_writer in result_writers.items()},
+                                              bad_ico=bad_ico_writer.checkpoint(),
+                                              fetched_icos=fetch_log.recorded,
+                                              content_hashes=content_hashes and content_hashes.current)
+                    if deadline and deadline.passed:
+                        logging.warning(f"The run reached the max runtime of {max_runtime:g} seconds")
+                        unprocessed = icos.remaining()
+        except DailyBudgetExceeded as error:
+            logging.warning(f"{error}, the remaining ICOs are fetched by the next run")
+            if processes == 1:
+                unprocessed = icos.remaining()
+        except FinstatUnavailableError as error:
+            api_error = str(error)
+            if processes == 1:
+                unprocessed = icos.remaining()
+        except FinstatApiError as error:
+            logging.error(error)
             exit(1)
+        finally:
+            if cache:
+                cache.close()
+                logging.info(f"Response cache hits : {cache.hits}, misses : {cache.misses}")
+                metrics.count("cache_hits", cache.hits)
+                metrics.count("cache_misses", cache.misses)
+            logging.info(metrics.progress_line())
+
+        if api_error:
+            if not metrics.counters.get("icos_processed"):
+                logging.error(api_error)
+                exit(1)
+            # the data fetched before the outage is kept, failing the job would lose it together with the state
+            logging.warning(f"{api_error}, the run stops and the remaining ICOs are fetched by the next run")
+        if unprocessed:
+            logging.warning(f"The run stopped before processing {len(unprocessed)} ICOs, "
+                            f"they are fetched by the next run")
+            metrics.count("icos_unprocessed", len(unprocessed))
+
+        if skip_fetched:
+            logging.info(f"Skipped {fetch_log.skipped} ICOs fetched in the last {refresh_days} days")
+
+        if content_hashes:
+            for counts in content_hashes.summary():
+                logging.info(f"{counts['request_type']} : {counts['new']} new, {counts['changed']} changed and "
+                             f"{counts['unchanged']} unchanged companies")
+            metrics.count("rows_unchanged", content_hashes.unchanged)
+
+        rows_written = sum(result_writer.rows_written for result_writer in result_writers.values())
+        # a run continuing with the ICOs left by the previous one may find none of them, its state is still written
+        nothing_to_write = (skip_fetched and fetch_log.skipped) or (content_hashes and content_hashes.unchanged) \
+            or unprocessed or unprocessed_icos
+        if rows_written == 0 and not nothing_to_write:
+            logging.error("Error : No output. "
+                          "Your API request type or keys might be incorrect or"
+                          " all ICO inputs are invalid")
+            logging.info("Response from Finstat:" + response_text)
+            exit(1)
+
+        for request_type, result_writer in result_writers.items():
+            if result_writer.rows_written == 0:
+                logging.info(f"No {request_type} data fetched, the {request_type} result table is not updated")
+                if output_format == "csv":
+                    os.remove(RESULT_FILE_PATHS[request_type])
+                    os.remove(RESULT_FILE_PATHS[request_type] + ".manifest")
+                elif sliced:
+                    shutil.rmtree(RESULT_FILE_PATHS[request_type])
+                continue
+            if sliced:
+                self._write_table_manifest(RESULT_FILE_PATHS[request_type], RESULT_PRIMARY_KEY, incremental_load,
+                                           columns=result_writer.columns)
+            if output_format == "parquet":
+                for parquet_path in result_writer.file_paths:
+                    self.configuration.write_file_manifest(parquet_path, file_tags=[PARQUET_FILE_TAG],
+                                                           is_permanent=False)
+            new_columns = column_registry.update(request_type, result_writer.columns)
+            if new_columns and len(new_columns) < len(result_writer.columns):
+                logging.info(f"Found {len(new_columns)} {request_type} columns not seen in the previous runs : "
+                             f"{', '.join(new_columns)}")
+            metrics.count("new_columns", len(new_columns))
+
+        if sliced:
+            self._write_table_manifest(NO_RESULT_FILE_PATH, BAD_ICO_COLUMNS, incremental_load,
+                                       columns=bad_ico_writer.columns)
+
+        if unchanged_summary:
+            summary_path = os.path.join(self.tables_out_path, UNCHANGED_SUMMARY_FILE_NAME)
+            with FinstatResultWriter(summary_path, SUMMARY_COLUMNS) as summary_writer:
+                summary_writer.write_all(content_hashes.summary())
+            self.configuration.write_table_manifest(file_name=summary_path)
+
+        if archive:
+            metrics.count("archived_responses", archive.count)
+        for archive_path in archive_paths:
+            if os.path.isfile(archive_path):
+                self.configuration.write_file_manifest(archive_path, file_tags=[ARCHIVE_FILE_TAG], is_permanent=False)
+        if archive_responses:
+            logging.info(f"Archived {metrics.counters.get('archived_responses', 0)} responses")
+
+        checkpointer.clear()
+
+        metrics_path = os.path.join(self.files_out_path, METRICS_FILE_NAME)
+        metrics.write(metrics_path)
+        self.configuration.write_file_manifest(metrics_path, file_tags=[METRICS_FILE_TAG], is_permanent=False)
 
         # print state file
-        previous_state = self.get_state_file()
         update_date = previous_state.get("last_update", " ")
         logging.info('Previous update on: %s', update_date)
 
         # update state file with current date
         current_date = str(datetime.now())
-        self.write_state_file({"last_update": current_date})
+        state = {"last_update": current_date,
+                 "daily_budget": daily_budget.to_state(),
+                 "columns": column_registry.to_state()}
+        if skip_fetched:
+            state["fetched_icos"] = fetch_log.to_state()
+        elif incremental:
+            # the replayed ICOs were not fetched by this run
+            state["fetched_icos"] = previous_state.get("fetched_icos", {})
+        if content_hashes:
+            state["content_hashes"] = content_hashes.to_state()
+        if unprocessed:
+            state["unprocessed_icos"] = unprocessed
+        self.write_state_file(state)
         logging.info('Updating state to : %s', current_date)
 
 
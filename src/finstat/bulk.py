@@ -0,0 +1,60 @@
+'''
+Bulk requests for the Finstat Extractor
+
+Accounts with a bulk endpoint get the DetailResults of several ICOs in one
+response. The response is split back into the single DetailResult responses,
+so the rest of the extractor handles them the same as single requests.
+'''
+
+import re
+
+DEFAULT_BATCH_SIZE = 50
+# the bulk endpoint is not available for the account, the run falls back to single requests
+BULK_UNAVAILABLE_STATUSES = (401, 403, 404, 405, 501)
+
+XML_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>\n'
+ROOT_START_TAG = re.compile(r"<(?![?!])[^\s>/]+([^>]*)>")
+NAMESPACE_DECLARATION = re.compile(r'\sxmlns(:[\w.-]+)?="[^"]*"')
+DETAIL_RESULT = re.compile(r"<DetailResult\b([^>]*)>(.*?)</DetailResult>", re.S)
+ICO_ELEMENT = re.compile(r"<Ico>\s*([^<]*?)\s*</Ico>")
+
+
+def get_bulk_endpoint(bulk_endpoint, request_type):
+    """Builds the path of the bulk endpoint of a request type
+
+            Parameters:
+            bulk_endpoint (string): Holds the configured path, {request_type} is replaced by the request type
+            request_type (string): Holds the API request type
+
+            Returns:
+            endpoint (string): Holds the path relative to the API url
+    """
+    return bulk_endpoint.replace("{request_type}", request_type)
+
+
+def split_bulk_result(response_text):
+    """Splits a bulk response into the DetailResult responses of the single ICOs
+
+        The namespaces declared on the root element of the bulk response are copied
+        to every DetailResult, so they parse to the same rows as single responses.
+
+            Parameters:
+            response_text (string): Holds the XML of the bulk response
+
+            Returns:
+            responses (dict): Holds the standalone DetailResult XML of each returned ICO
+    """
+    root = ROOT_START_TAG.search(response_text)
+    declarations = list(NAMESPACE_DECLARATION.finditer(root.group(1))) if root else []
+    responses = {}
+    for detail_result in DETAIL_RESULT.finditer(response_text):
+        attributes, body = detail_result.groups()
+        ico = ICO_ELEMENT.search(body)
+        if not ico:
+            continue
+        # prefixes declared by the DetailResult itself are not copied
+        own_prefixes = {declaration.group(1) for declaration in NAMESPACE_DECLARATION.finditer(attributes)}
+        inherited = "".join(declaration.group(0) for declaration in declarations
+                            if declaration.group(1) not in own_prefixes)
+        responses[ico.group(1)] = f"{XML_DECLARATION}<DetailResult{inherited}{attributes}>{body}</DetailResult>\n"
+    return responses
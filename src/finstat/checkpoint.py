@@ -0,0 +1,79 @@
+'''
+Checkpoints for the Finstat Extractor
+
+Periodically stores how far the run got and how much of the output files
+is complete, so an interrupted run can continue from the last checkpoint
+when it is started again with the same data folder.
+'''
+
+import json
+import os
+import time
+
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+
+DEFAULT_CHECKPOINT_EVERY = 1000
+DEFAULT_CHECKPOINT_INTERVAL = 300
+
+
+class Checkpointer:
+    """
+    Stores the checkpoints of a run in a json file.
+
+    Checkpoints are only loaded by a run with the same fingerprint, a run with another configuration
+    or input starts over.
+    """
+
+    def __init__(self, path, fingerprint, every=DEFAULT_CHECKPOINT_EVERY, interval=DEFAULT_CHECKPOINT_INTERVAL,
+                 clock=time.monotonic):
+        """
+        :param path: path of the checkpoint file
+        :param fingerprint: string identifying the configuration and input of the run
+        :param every: a checkpoint is due after this many processed ICOs
+        :param interval: a checkpoint is due after this many seconds
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.every = every
+        self.interval = interval
+        self._clock = clock
+        self._last_offset = 0
+        self._last_time = clock()
+
+    def load(self):
+        """
+        Returns the data of the last checkpoint or None if there is no checkpoint of this run.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding='utf-8') as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint.get("fingerprint") != self.fingerprint:
+            return None
+        self._last_offset = checkpoint["offset"]
+        return checkpoint
+
+    def is_due(self, offset):
+        """
+        :param offset: number of ICOs processed so far
+        """
+        return offset - self._last_offset >= self.every or self._clock() - self._last_time >= self.interval
+
+    def save(self, offset, **data):
+        """
+        Stores a checkpoint, replacing the previous one at once so a failure never leaves a partial file.
+
+        :param offset: number of ICOs processed so far
+        :param data: json serializable state needed to resume the run
+        """
+        checkpoint = {"fingerprint": self.fingerprint, "offset": offset, **data}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(tmp_path, self.path)
+        self._last_offset = offset
+        self._last_time = self._clock()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,40 @@
+'''
+Column schema registry for the Finstat Extractor
+
+Remembers in the state file the flattened columns seen for each request
+type, so the writers can write the full header up front and only rewrite
+it when a response brings a column that was never seen before.
+'''
+
+
+class ColumnRegistry:
+    """
+    Ordered column lists of the flattened responses per request type.
+    """
+
+    def __init__(self, known=None):
+        """
+        :param known: dict of request type to list of columns, as stored by to_state
+        """
+        self._columns = {request_type: list(columns) for request_type, columns in (known or {}).items()}
+
+    def columns(self, request_type):
+        """
+        Returns the columns known for the request type, in the order they were first seen.
+        """
+        return list(self._columns.get(request_type, []))
+
+    def update(self, request_type, columns):
+        """
+        Appends the columns not known yet for the request type, keeping the order of the known ones.
+
+        :return: list of the newly added columns
+        """
+        known = self._columns.setdefault(request_type, [])
+        known_set = set(known)
+        added = [column for column in columns if column not in known_set]
+        known.extend(added)
+        return added
+
+    def to_state(self):
+        return {request_type: list(columns) for request_type, columns in self._columns.items()}
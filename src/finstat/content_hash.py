@@ -0,0 +1,105 @@
+'''
+Change detection for the Finstat Extractor
+
+Remembers in the state file a hash of the last row of every ICO, so a run
+can write only the companies whose data changed since the previous run and
+load them incrementally instead of reloading the whole table.
+'''
+
+import hashlib
+import json
+
+SUMMARY_COLUMNS = ["request_type", "new", "changed", "unchanged"]
+
+
+def hash_row(row):
+    """Hashes the content of a flat row
+
+        Empty values are left out and the values are compared as written to the csv,
+        so a row read back from a csv slice hashes the same as the parsed response.
+
+            Parameters:
+            row (dict): Holds the flattened response
+
+            Returns:
+            row_hash (string): Holds the first 16 hex digits of the SHA-256 of the row
+    """
+    content = {column: str(value) for column, value in row.items() if value is not None and value != ""}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+
+
+class ContentHashes:
+    """
+    Row hashes per request type and ICO.
+    """
+
+    def __init__(self, previous=None, current=None):
+        """
+        :param previous: dict of request type to dict of ICO to row hash, as stored by to_state
+        :param current: hashes recorded by this run before it was resumed from a checkpoint
+        """
+        self.previous = previous or {}
+        self.current = current or {}
+        self.counts = {}
+
+    def is_changed(self, request_type, ico, row):
+        """
+        Records the hash of the row and tells if it differs from the previous run, new ICOs are changed.
+        """
+        row_hash = hash_row(row)
+        self.current.setdefault(request_type, {})[ico] = row_hash
+        previous_hash = self.previous.get(request_type, {}).get(ico)
+        status = "new" if previous_hash is None else "unchanged" if previous_hash == row_hash else "changed"
+        counts = self.counts.setdefault(request_type, dict.fromkeys(SUMMARY_COLUMNS[1:], 0))
+        counts[status] += 1
+        return status != "unchanged"
+
+    @property
+    def unchanged(self):
+        return sum(counts["unchanged"] for counts in self.counts.values())
+
+    def summary(self):
+        """
+        Returns the rows of the summary table, the number of new, changed and unchanged ICOs per request type.
+        """
+        return [dict(counts, request_type=request_type) for request_type, counts in self.counts.items()]
+
+    def to_state(self):
+        # ICOs not fetched by this run keep their previous hash
+        return {request_type: {**self.previous.get(request_type, {}), **self.current.get(request_type, {})}
+                for request_type in set(self.previous) | set(self.current)}
+
+
+class ChangedRowsWriter:
+    """
+    Wraps a result writer, so only the rows that changed since the previous run are written.
+    """
+
+    def __init__(self, writer, content_hashes, request_type, ico_column="Ico"):
+        """
+        :param writer: FinstatResultWriter or FinstatParquetWriter the changed rows are written to
+        :param content_hashes: ContentHashes of the run
+        :param request_type: request type of the written rows
+        :param ico_column: column with the ICO of the company
+        """
+        self.writer = writer
+        self.content_hashes = content_hashes
+        self.request_type = request_type
+        self.ico_column = ico_column
+
+    def write(self, row):
+        if self.content_hashes.is_changed(self.request_type, row.get(self.ico_column), row):
+            self.writer.write(row)
+
+    def write_all(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def __getattr__(self, name):
+        return getattr(self.writer, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.writer.close()
@@ -0,0 +1,111 @@
+'''
+Fetch scheduling for the Finstat Extractor
+
+Runs the per ICO API calls either sequentially or in a bounded
+thread pool while keeping the results in input order
+'''
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# how many requests may be queued per worker before results are consumed
+QUEUE_FACTOR = 2
+
+
+def fetch_ordered(fetch_function, items, max_workers=1):
+    """Applies fetch_function to each item and yields the results in input order
+
+        With max_workers > 1 the calls run in a thread pool. At most
+        max_workers * QUEUE_FACTOR calls are in flight at once, so the
+        items may be a generator of any length.
+
+            Parameters:
+            fetch_function (function): Called with a single item
+            items (iterable): Holds the items to be fetched
+            max_workers (int): Holds the size of the worker pool
+
+            Returns:
+            results (generator): Yields (item, result) tuples in input order
+    """
+    if max_workers <= 1:
+        for item in items:
+            yield item, fetch_function(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append((item, executor.submit(fetch_function, item)))
+            if len(pending) >= max_workers * QUEUE_FACTOR:
+                done_item, future = pending.popleft()
+                yield done_item, future.result()
+        while pending:
+            done_item, future = pending.popleft()
+            yield done_item, future.result()
+
+
+class PendingItems:
+    """
+    Iterator remembering the items taken from it that were not finished yet.
+
+    The items have to be finished in the order they were taken, so when a run stops in the middle,
+    the items taken but not finished and the items not taken yet are the ones left for the next run.
+    """
+
+    def __init__(self, items):
+        self._items = iter(items)
+        self._pending = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._items)
+        self._pending.append(item)
+        return item
+
+    def done(self):
+        """
+        Marks the oldest pending item as finished.
+        """
+        self._pending.popleft()
+
+    def remaining(self):
+        """
+        Returns the pending items and the items not taken yet, taking all of them from the iterator.
+        """
+        remaining = list(self._pending) + list(self._items)
+        self._pending.clear()
+        return remaining
+
+
+class Deadline:
+    """
+    Point in time after which a run does not start fetching new items.
+    """
+
+    def __init__(self, at, clock=time.time):
+        """
+        :param at: unix timestamp of the deadline, wall clock time so it can be passed to other processes
+        """
+        self.at = at
+        self._clock = clock
+
+    @property
+    def passed(self):
+        return self._clock() >= self.at
+
+    def until(self, items):
+        """
+        Yields the items until the deadline passes.
+
+        The deadline is checked before an item is taken, so the items not yielded stay in the iterator.
+        """
+        items = iter(items)
+        while not self.passed:
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            yield item
@@ -0,0 +1,168 @@
+'''
+HTTP client for the Finstat API
+
+Keeps a single pooled session for the whole run, so consecutive
+API calls reuse open keep-alive connections to finstat.sk
+instead of doing a new TCP and TLS handshake for every ICO.
+
+Requests are rate limited on the client side. Throttling (429/503)
+and other transient failures are retried with backoff, so they never
+end up reported as invalid ICOs.
+'''
+
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from kbc.client_base import HttpClientBase
+
+from finstat.metrics import NoMetrics
+from finstat.throttling import DailyBudget, NoLimit
+
+BASE_URL = "https://finstat.sk/api/"
+
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+# seconds to wait for connecting to and reading from the API
+TIMEOUT = (10, 60)
+
+DEFAULT_POOL_SIZE = 10
+
+# the API is overloaded or the plan limit is hit, the request rate is lowered
+THROTTLE_STATUSES = (429, 503)
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+# the ICO is not in the Finstat database or is not a valid ICO
+INVALID_ICO_STATUSES = (400, 404)
+
+MAX_TRANSIENT_RETRIES = 8
+TRANSIENT_BACKOFF = 1
+MAX_TRANSIENT_BACKOFF = 60
+
+
+class FinstatApiError(Exception):
+    pass
+
+
+class FinstatUnavailableError(FinstatApiError):
+    """
+    The API kept failing with transient errors, e.g. during an outage.
+    """
+
+
+class FinstatClient(HttpClientBase):
+    """
+    HTTP client for the Finstat API.
+
+    It extends the kbc.client_base.HttpClientBase class. Unlike the base class, which opens a new session
+    for every call, it owns one pooled session that is shared by all calls and threads of the run.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, base_url=BASE_URL, rate_limiter=None, daily_budget=None,
+                 metrics=None, sleep=time.sleep):
+        """
+        :param pool_size: number of keep-alive connections kept open
+        :param base_url: url of the Finstat API
+        :param rate_limiter: finstat.throttling.TokenBucket, requests are not rate limited if not set
+        :param daily_budget: finstat.throttling.DailyBudget, requests are not counted if not set
+        :param metrics: finstat.metrics.RunMetrics collecting the request latencies and statuses
+        :param sleep: function waiting the given number of seconds before a retry
+        """
+        HttpClientBase.__init__(self, base_url=base_url, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR,
+                                status_forcelist=())
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter or NoLimit()
+        self.daily_budget = daily_budget or DailyBudget()
+        self.metrics = metrics or NoMetrics()
+        self._sleep = sleep
+        self._session = self.requests_retry_session()
+
+    def requests_retry_session(self, session=None):
+        """
+        Overridden to size the connection pool and keep the connections alive between calls.
+
+        :param session: optional requests.Session to set up
+        :return: requests.Session with the pooled adapter mounted
+        """
+        session = session or requests.Session()
+        # 429 and 503 responses are retried by get_detail, which also lowers the request rate,
+        # so urllib3 must not retry them on its own when they carry a Retry-After header
+        retry = Retry(total=self.max_retries, connect=self.max_retries, read=self.max_retries,
+                      backoff_factor=self.backoff_factor, status_forcelist=self.status_forcelist,
+                      raise_on_status=False, respect_retry_after_header=False)
+        # pool_block keeps the number of open connections at pool_size even with more worker threads
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry, pool_block=True)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    def get_raw(self, *args, **kwargs):
+        """
+        Overridden to send the request over the shared session instead of a new one.
+        """
+        kwargs.setdefault('timeout', TIMEOUT)
+        return self._session.request('GET', *args, **kwargs)
+
+    def get_detail(self, request_type, params):
+        """
+        Get a single company detail.
+
+        Transient failures are retried, so the returned response is either successful,
+        an invalid ICO (see INVALID_ICO_STATUSES) or another non retryable error.
+
+        :param request_type: detail, extended or ultimate
+        :param params: dict with the ico, apiKey and Hash parameters
+        :return: requests.Response
+        :raises FinstatUnavailableError: when the request keeps failing after MAX_TRANSIENT_RETRIES retries
+        :raises finstat.throttling.DailyBudgetExceeded: when the daily request limit is reached
+        """
+        for attempt in range(MAX_TRANSIENT_RETRIES + 1):
+            self.rate_limiter.acquire()
+            self.daily_budget.spend()
+            self.metrics.count("http_requests")
+            try:
+                with self.metrics.timer("http"):
+                    response = self.get_raw(self.base_url + request_type, params=params)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                self.metrics.count("http_connection_errors")
+                failure = str(error)
+                delay = self._backoff(attempt)
+            else:
+                self.metrics.count(f"http_status_{response.status_code}")
+                if response.status_code not in TRANSIENT_STATUSES:
+                    self.rate_limiter.recover()
+                    return response
+                if response.status_code in THROTTLE_STATUSES:
+                    self.metrics.count("http_throttled")
+                    self.rate_limiter.throttle()
+                failure = f'status {response.status_code}'
+                delay = self._retry_after(response) or self._backoff(attempt)
+            if attempt < MAX_TRANSIENT_RETRIES:
+                self.metrics.count("http_retries")
+                logging.debug(f"Request for ico {params.get('ico')} failed with {failure}, retrying in {delay}s")
+                self._sleep(delay)
+        raise FinstatUnavailableError(f"Request for ico {params.get('ico')} failed after {MAX_TRANSIENT_RETRIES} "
+                                      f"retries with {failure}")
+
+    @staticmethod
+    def _backoff(attempt):
+        return min(MAX_TRANSIENT_BACKOFF, TRANSIENT_BACKOFF * 2 ** attempt)
+
+    @staticmethod
+    def _retry_after(response):
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(MAX_TRANSIENT_BACKOFF, int(retry_after))
+        return None
+
+    def close(self):
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
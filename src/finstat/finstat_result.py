@@ -0,0 +1,121 @@
+'''
+Output writers for the Finstat Extractor
+
+Rows are appended to the output csv as soon as they are fetched,
+so memory use does not grow with the number of ICOs and the rows
+fetched before a failure stay on the disk.
+'''
+
+import csv
+import os
+
+
+def read_rows(file_path):
+    """Reads the rows of a csv file written by FinstatResultWriter
+
+            Parameters:
+            file_path (string): Holds the path of the csv file
+
+            Returns:
+            rows (generator): Yields the rows as dicts of column name to value
+    """
+    with open(file_path, newline='', encoding='utf-8') as csv_file:
+        reader = csv.reader(csv_file)
+        columns = next(reader, [])
+        for values in reader:
+            yield dict(zip(columns, values))
+
+
+class FinstatResultWriter:
+    """
+    Streaming csv writer for flattened Finstat responses.
+
+    The header holds the union of the keys of all written rows, in the order they first appeared, the same as
+    pandas.DataFrame.from_records. Columns first seen after the header was written are appended to the rows
+    as they come and the file is rewritten once with the full header on close.
+    """
+
+    def __init__(self, file_path, columns=None, buffer_size=8192, resume=None):
+        """
+        :param file_path: path of the output csv file
+        :param columns: list of columns known up front, these are written first in the given order
+        :param buffer_size: size of the write buffer in bytes
+        :param resume: dict returned by checkpoint, the file is cut to the checkpoint and appended to
+        """
+        self.file_path = file_path
+        self.columns = list(columns or [])
+        self.rows_written = 0
+        self._header_length = None
+        if resume:
+            self.columns = list(resume["columns"])
+            self.rows_written = resume["rows_written"]
+            self._header_length = resume["header_length"]
+            # drop the rows written after the checkpoint
+            with open(file_path, 'r+b') as out_file:
+                out_file.truncate(resume["size"])
+        self._known_columns = set(self.columns)
+        self._file = open(file_path, 'a' if resume else 'w', newline='', encoding='utf-8', buffering=buffer_size)
+        self._writer = csv.writer(self._file)
+
+    def write(self, row):
+        """
+        Appends a single row.
+
+        :param row: dict of column name to value, None values are written as empty strings
+        """
+        for column in row:
+            if column not in self._known_columns:
+                self._known_columns.add(column)
+                self.columns.append(column)
+        if self._header_length is None:
+            self._writer.writerow(self.columns)
+            self._header_length = len(self.columns)
+        self._writer.writerow([row.get(column) for column in self.columns])
+        self.rows_written += 1
+
+    def write_all(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        self._file.flush()
+
+    def checkpoint(self):
+        """
+        Flushes the written rows and returns the state needed to resume writing after them.
+        """
+        self.flush()
+        return {"columns": list(self.columns), "header_length": self._header_length,
+                "rows_written": self.rows_written, "size": self._file.tell()}
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self._header_length is None and self.columns:
+            self._writer.writerow(self.columns)
+            self._header_length = len(self.columns)
+        self._file.close()
+        if self._header_length is not None and self._header_length < len(self.columns):
+            self._rewrite_header()
+
+    def _rewrite_header(self):
+        """
+        Rewrites the file with the full header, padding the rows written before new columns appeared.
+        """
+        tmp_path = self.file_path + '.tmp'
+        column_count = len(self.columns)
+        with open(self.file_path, newline='', encoding='utf-8') as src, \
+                open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            next(reader)
+            writer.writerow(self.columns)
+            for row in reader:
+                writer.writerow(row + [''] * (column_count - len(row)))
+        os.replace(tmp_path, self.file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
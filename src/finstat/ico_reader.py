@@ -0,0 +1,109 @@
+'''
+Input reader for the Finstat Extractor
+
+Streams the ICOs from the input csv file row by row, so the size
+of the input table does not affect the memory of the component.
+The ICOs are normalized to their canonical 8 digit form before they
+are deduplicated, so formatting variants are fetched only once.
+'''
+
+import csv
+import re
+from collections import Counter
+from decimal import Decimal
+
+ICO_COLUMN = "ico"
+ICO_LENGTH = 8
+
+VALID_ICO = re.compile(r"\d{%d}" % ICO_LENGTH)
+# numbers as written by tools that read the ICOs as floats, e.g. 35757442.0 or 3.5757442E7
+FLOAT_NUMBER = re.compile(r"\d+(\.\d*)?([eE]\+?\d+)?")
+# thousands separators used when the ICOs are formatted by hand, e.g. 35 757 442
+SEPARATORS = re.compile(r"[\s ]+")
+
+
+def normalize_ico(value):
+    """Converts an ICO to its canonical form
+
+        Separators are removed, float formatting is undone and the leading zeros
+        lost by numeric columns are added back. Values that can not be an ICO are
+        returned stripped, is_valid_ico tells them apart.
+
+            Parameters:
+            value (string): Holds the ICO as read from the input
+
+            Returns:
+            ico (string): Holds the 8 digit ICO, or the stripped value if it is malformed
+    """
+    value = value.strip()
+    ico = SEPARATORS.sub("", value)
+    if not ico.isdigit() and FLOAT_NUMBER.fullmatch(ico):
+        number = Decimal(ico)
+        if number >= 10 ** ICO_LENGTH or number != number.to_integral_value():
+            return value
+        ico = str(int(number))
+    if ico.isdigit() and len(ico) <= ICO_LENGTH:
+        return ico.zfill(ICO_LENGTH)
+    return value
+
+
+def is_valid_ico(ico):
+    """Checks that a normalized ICO has the format Finstat accepts, malformed ICOs are not sent to the API
+
+            Parameters:
+            ico (string): Holds the normalized ICO
+
+            Returns:
+            valid (bool): True if the ICO has 8 digits
+    """
+    return bool(VALID_ICO.fullmatch(ico))
+
+
+def _read_ico_values(filepath):
+    with open(filepath, newline='', encoding='utf-8') as ico_file:
+        reader = csv.reader(ico_file)
+        header = next(reader, [])
+        column_index = header.index(ICO_COLUMN) if ICO_COLUMN in header else 0
+        for row in reader:
+            if len(row) <= column_index:
+                continue
+            ico = normalize_ico(row[column_index])
+            if ico:
+                yield ico
+
+
+def get_icos_from_file(filepath):
+    """Retrieves ICOs to be fetched from a CSV file
+
+        First looks for an ico column, if this does not exist,
+        it takes the first column in the csv file.
+        The ICOs are read as strings and normalized with normalize_ico.
+        Empty values and repeated ICOs are skipped.
+
+            Parameters:
+            filepath (string): Holds the path to the csv file
+
+            Returns:
+            icos (generator): Yields the unique ICOs from the file in the order of the file
+    """
+    seen = set()
+    for ico in _read_ico_values(filepath):
+        if ico not in seen:
+            seen.add(ico)
+            yield ico
+
+
+def get_ico_multiplicity(filepath):
+    """Counts the ICOs repeated in a CSV file
+
+        Used to write the result of a repeated ICO once for every input row,
+        while the ICO is fetched only once.
+
+            Parameters:
+            filepath (string): Holds the path to the csv file
+
+            Returns:
+            multiplicity (dict): Holds the number of occurrences of each ICO found more than once
+    """
+    counts = Counter(_read_ico_values(filepath))
+    return {ico: count for ico, count in counts.items() if count > 1}
@@ -0,0 +1,44 @@
+'''
+Incremental fetching for the Finstat Extractor
+
+Remembers in the state file when each ICO was last fetched successfully,
+so the next run only fetches new ICOs, ICOs older than the refresh window
+and ICOs that failed before.
+'''
+
+from datetime import date, timedelta
+
+DEFAULT_REFRESH_DAYS = 30
+
+
+class FetchLog:
+    """
+    Dates of the last successful fetch per ICO.
+    """
+
+    def __init__(self, fetched=None, refresh_days=DEFAULT_REFRESH_DAYS, today=None, recorded=None):
+        """
+        :param fetched: dict of ICO to ISO date of its last successful fetch, as stored by to_state
+        :param refresh_days: ICOs fetched this many days ago or earlier are fetched again
+        :param today: date of the run, defaults to today
+        :param recorded: ICOs already fetched by this run before it was resumed from a checkpoint
+        """
+        self.today = today or date.today()
+        oldest = (self.today - timedelta(days=refresh_days)).isoformat()
+        # ICOs outside of the refresh window would be fetched anyway, so they are dropped to keep the state small
+        self.fetched = {ico: day for ico, day in (fetched or {}).items() if day > oldest}
+        # kept apart from fetched, so the ICOs skipped by a run do not change when it is resumed
+        self.recorded = dict(recorded or {})
+        self.skipped = 0
+
+    def needs_fetch(self, ico):
+        if ico in self.fetched:
+            self.skipped += 1
+            return False
+        return True
+
+    def record(self, ico):
+        self.recorded[ico] = self.today.isoformat()
+
+    def to_state(self):
+        return {**self.fetched, **self.recorded}
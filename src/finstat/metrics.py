@@ -0,0 +1,202 @@
+'''
+Run metrics for the Finstat Extractor
+
+Counts the processed ICOs and API responses, keeps latency histograms
+of the run stages, logs periodic progress lines and stores everything
+as a JSON file at the end of the run.
+'''
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE_NAME = "finstat-metrics.json"
+METRICS_FILE_TAG = "finstat_metrics"
+
+DEFAULT_PROGRESS_INTERVAL = 30
+# upper bounds of the latency histogram buckets in milliseconds, the last bucket is unbounded
+BUCKET_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+
+def count_input_rows(filepath):
+    """Counts the rows of a csv file without parsing it
+
+        Used for the progress estimate only, values with line breaks
+        and repeated ICOs make it an upper bound.
+
+            Parameters:
+            filepath (string): Holds the path to the csv file
+
+            Returns:
+            row_count (int): Holds the number of lines without the header
+    """
+    lines = 0
+    with open(filepath, 'rb') as input_file:
+        for chunk in iter(lambda: input_file.read(1024 * 1024), b''):
+            lines += chunk.count(b'\n')
+    return max(0, lines - 1)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        milliseconds = seconds * 1000
+        index = 0
+        while index < len(BUCKET_BOUNDS_MS) and milliseconds > BUCKET_BOUNDS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def merge(self, other):
+        """
+        Adds the observations of another histogram, e.g. of a shard run in another process.
+        """
+        self.buckets = [count + other_count for count, other_count in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, share):
+        """
+        Returns the upper bound of the bucket holding the given share of the observations, in milliseconds.
+        """
+        if not self.count:
+            return None
+        threshold = share * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= threshold:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max
+        return self.max
+
+    def to_dict(self):
+        labels = [f"le_{bound}ms" for bound in BUCKET_BOUNDS_MS] + ["inf"]
+        return {"count": self.count,
+                "total_ms": round(self.total, 3),
+                "mean_ms": round(self.total / self.count, 3) if self.count else None,
+                "p50_ms": self.percentile(0.5),
+                "p95_ms": self.percentile(0.95),
+                "max_ms": round(self.max, 3),
+                "buckets": dict(zip(labels, self.buckets))}
+
+
+class RunMetrics:
+    """
+    Thread safe counters and stage latency histograms of a run.
+    """
+
+    def __init__(self, total_estimate=None, progress_interval=DEFAULT_PROGRESS_INTERVAL, clock=time.monotonic):
+        """
+        :param total_estimate: expected number of ICOs, used for the ETA in the progress lines
+        :param progress_interval: seconds between the progress lines
+        """
+        self.total_estimate = total_estimate
+        self.progress_interval = progress_interval
+        self.counters = {}
+        self.stages = {}
+        self._clock = clock
+        self._start = clock()
+        self._last_progress = self._start
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def merge(self, counters, stages):
+        """
+        Adds the counters and stage histograms collected by another RunMetrics, e.g. of a shard process.
+
+        :param counters: dict of counter name to value
+        :param stages: dict of stage name to Histogram
+        """
+        with self._lock:
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for stage, other in stages.items():
+                histogram = self.stages.get(stage)
+                if histogram is None:
+                    histogram = self.stages[stage] = Histogram()
+                histogram.merge(other)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def ico_processed(self, ok):
+        """
+        Counts a processed ICO and logs a progress line when it is due.
+
+        :param ok: False if the ICO ended up in the bad ICO table
+        """
+        self.count("icos_processed")
+        self.count("icos_ok" if ok else "icos_invalid")
+        now = self._clock()
+        if now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            logging.info(self.progress_line())
+
+    def progress_line(self):
+        processed = self.counters.get("icos_processed", 0)
+        elapsed = self._clock() - self._start
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        error_rate = self.counters.get("icos_invalid", 0) / processed if processed else 0.0
+        line = f"Processed {processed} ICOs, {rate:.1f} ICOs/s, {error_rate:.1%} invalid"
+        if self.total_estimate and rate > 0:
+            remaining = max(0, self.total_estimate - processed)
+            line += f", about {remaining} remaining, ETA {remaining / rate:.0f}s"
+        return line
+
+    def to_dict(self):
+        with self._lock:
+            elapsed = self._clock() - self._start
+            processed = self.counters.get("icos_processed", 0)
+            return {"elapsed_seconds": round(elapsed, 3),
+                    "icos_per_second": round(processed / elapsed, 3) if elapsed > 0 else None,
+                    "counters": dict(self.counters),
+                    "stages": {stage: histogram.to_dict() for stage, histogram in self.stages.items()}}
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as metrics_file:
+            json.dump(self.to_dict(), metrics_file, indent=2)
+
+
+class NoMetrics:
+    """
+    Stand-in for RunMetrics when the caller does not collect metrics.
+    """
+
+    def count(self, name, value=1):
+        pass
+
+    def observe(self, stage, seconds):
+        pass
+
+    @contextmanager
+    def timer(self, stage):
+        yield
@@ -0,0 +1,202 @@
+'''
+Parquet output for the Finstat Extractor
+
+Writes the flattened responses as typed, compressed Parquet row groups
+while they stream in. pyarrow is installed with the component, it is only
+imported when the Parquet output is used, so the other runs start faster.
+'''
+
+import logging
+import re
+from datetime import datetime
+
+DEFAULT_ROW_GROUP_SIZE = 10000
+DEFAULT_COMPRESSION = "snappy"
+
+# types of the DetailResult fields, keyed by the last part of the flattened column name,
+# other fields are stored as strings
+INTEGER_FIELDS = {"EmployeeCode", "ActualYear"}
+FLOAT_FIELDS = {"Revenue", "RevenueActual", "RevenuePrev", "ProfitActual", "ProfitPrev", "CreditScoreValue",
+                "BasicCapital"}
+BOOLEAN_FIELDS = {"SuspendedAsPerson", "Warning", "PaymentOrderWarning", "OrChange", "HasKaR", "HasDebt",
+                  "Bankrupt", "Restructuring", "Liquidation", "@xsi:nil"}
+TIMESTAMP_FIELDS = {"Created", "Cancelled"}
+# the yearly statements of the ultimate request, e.g. Financials__Year2019__EBITDA, are amounts and ratios,
+# they are stored as floats unless the first row group of the part has a value that is not a number
+NUMERIC_PREFIXES = ("Financials__",)
+NUMBER_PATTERN = re.compile(r"^-?\d+(\.\d+)?([eE][-+]?\d+)?$")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The parquet output format needs the pyarrow package, install requirements.txt "
+                          "or use the csv format")
+    return pyarrow, pyarrow.parquet
+
+
+def _field_name(column):
+    parts = column.split("__")
+    # the text of an element with attributes, e.g. the amount of <BasicCapital currency="EUR">
+    if parts[-1] == "#text" and len(parts) > 1:
+        return parts[-2]
+    return parts[-1]
+
+
+def _to_int(value):
+    return int(value)
+
+
+def _to_float(value):
+    return float(value)
+
+
+def _to_bool(value):
+    if value in ("true", "True", "1"):
+        return True
+    if value in ("false", "False", "0"):
+        return False
+    raise ValueError(f"{value} is not a boolean")
+
+
+def _to_timestamp(value):
+    return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+
+
+def _is_number(value):
+    return isinstance(value, str) and NUMBER_PATTERN.match(value) is not None
+
+
+def column_type(column, values=()):
+    """Returns the pyarrow type and the converter of a flattened DetailResult column
+
+            Parameters:
+            column (string): Holds the flattened column name
+            values (iterable): Holds sample values of the column, a financial column with a value
+            that is not a number is stored as strings
+
+            Returns:
+            column_type (tuple): Holds the pyarrow type and a function converting the string value to it
+    """
+    pa, _ = _import_pyarrow()
+    field = _field_name(column)
+    if field in INTEGER_FIELDS:
+        return pa.int64(), _to_int
+    if field in FLOAT_FIELDS:
+        return pa.float64(), _to_float
+    if field in BOOLEAN_FIELDS:
+        return pa.bool_(), _to_bool
+    if field in TIMESTAMP_FIELDS:
+        return pa.timestamp("s"), _to_timestamp
+    if column.startswith(NUMERIC_PREFIXES) and \
+            all(_is_number(value) for value in values if value is not None and value != ""):
+        return pa.float64(), _to_float
+    return pa.string(), str
+
+
+class FinstatParquetWriter:
+    """
+    Streaming Parquet writer with the same write interface as finstat.finstat_result.FinstatResultWriter.
+
+    Rows are buffered up to row_group_size and then written as one row group. The schema is fixed by the first
+    row group, a row group with new columns starts a new part file, named <name>-part-<n>.parquet. The type of
+    a column is kept in the later parts.
+    """
+
+    def __init__(self, file_path, columns=None, row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                 compression=DEFAULT_COMPRESSION):
+        """
+        :param file_path: path of the output parquet file
+        :param columns: list of columns known up front, these are written first in the given order
+        :param row_group_size: number of rows in a row group
+        :param compression: parquet compression codec
+        """
+        self._pa, self._pq = _import_pyarrow()
+        self.file_path = file_path
+        self.file_paths = []
+        self.columns = list(columns or [])
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.rows_written = 0
+        self._known_columns = set(self.columns)
+        self._buffer = []
+        self._writer = None
+        self._schema_length = 0
+        self._converters = []
+        self._column_types = {}
+        self._failed_columns = set()
+
+    def write(self, row):
+        for column in row:
+            if column not in self._known_columns:
+                self._known_columns.add(column)
+                self.columns.append(column)
+        self._buffer.append(row)
+        self.rows_written += 1
+        if len(self._buffer) >= self.row_group_size:
+            self._write_row_group()
+
+    def write_all(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def _convert(self, column, converter, value):
+        if value is None or value == "":
+            return None
+        if isinstance(value, list):
+            # repeated elements are stored the same way as in the csv output
+            value = str(value)
+        try:
+            return converter(value)
+        except (TypeError, ValueError):
+            if column not in self._failed_columns:
+                self._failed_columns.add(column)
+                logging.warning(f"Column {column} has values that do not match its type, they are stored as null")
+            return None
+
+    def _open_part(self):
+        if self._writer is not None:
+            self._writer.close()
+        path = self.file_path
+        if self.file_paths:
+            base = self.file_path[:-len(".parquet")] if self.file_path.endswith(".parquet") else self.file_path
+            path = f"{base}-part-{len(self.file_paths)}.parquet"
+        fields = []
+        self._converters = []
+        for column in self.columns:
+            if column not in self._column_types:
+                self._column_types[column] = column_type(column, (row.get(column) for row in self._buffer))
+            arrow_type, converter = self._column_types[column]
+            fields.append(self._pa.field(column, arrow_type))
+            self._converters.append(converter)
+        self._writer = self._pq.ParquetWriter(path, self._pa.schema(fields), compression=self.compression)
+        self._schema_length = len(self.columns)
+        self.file_paths.append(path)
+
+    def _write_row_group(self):
+        if not self._buffer:
+            return
+        if self._writer is None or self._schema_length < len(self.columns):
+            self._open_part()
+        arrays = {}
+        for column, converter in zip(self.columns, self._converters):
+            arrays[column] = [self._convert(column, converter, row.get(column)) for row in self._buffer]
+        self._writer.write_table(self._pa.Table.from_pydict(arrays, schema=self._writer.schema))
+        self._buffer = []
+
+    def flush(self):
+        self._write_row_group()
+
+    def close(self):
+        self._write_row_group()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
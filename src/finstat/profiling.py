@@ -0,0 +1,121 @@
+'''
+Profiling for the Finstat Extractor
+
+Profiles a run with cProfile, in the main thread and in the threads it
+starts, and traces its memory allocations with tracemalloc. The profile
+and a summary of the hottest functions and allocation sites are written
+to the output files, so a slow run can be diagnosed from its job.
+'''
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILE_FILE_NAME = "finstat-profile.prof"
+PROFILE_SUMMARY_FILE_NAME = "finstat-profile.txt"
+PROFILE_FILE_TAG = "finstat_profile"
+
+DEFAULT_TOP = 30
+# frames stored per traced allocation, more frames make the tracing slower
+TRACEMALLOC_FRAMES = 1
+# from 3.12 a single profiler sees all threads, older versions need one per thread
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+class RunProfiler:
+    """
+    Deterministic profiler of a run with the allocation statistics of tracemalloc.
+    """
+
+    def __init__(self, top=DEFAULT_TOP, trace_memory=True, clock=time.monotonic):
+        """
+        :param top: number of functions and allocation sites listed in the summary
+        :param trace_memory: traces the allocations with tracemalloc, which slows the run down
+        """
+        self.top = top
+        self.trace_memory = trace_memory
+        self._clock = clock
+        self._profile = cProfile.Profile()
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+        self._started = None
+        self.seconds = None
+        self._snapshot = None
+        self._traced_memory = None
+
+    def start(self):
+        self._started = self._clock()
+        if self.trace_memory:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        if PER_THREAD_PROFILES:
+            threading.setprofile(self._profile_thread)
+        self._profile.enable()
+
+    def _profile_thread(self, frame, event, arg):
+        # the first event of a new thread replaces this hook by a profiler of the thread
+        profile = cProfile.Profile()
+        with self._lock:
+            self._thread_profiles.append(profile)
+        profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+        if PER_THREAD_PROFILES:
+            threading.setprofile(None)
+        self.seconds = self._clock() - self._started
+        if tracemalloc.is_tracing():
+            self._traced_memory = tracemalloc.get_traced_memory()
+            self._snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ])
+            tracemalloc.stop()
+
+    def stats(self):
+        """
+        Returns the pstats.Stats of the run, merged from the profiles of all its threads.
+        """
+        stats = pstats.Stats(self._profile)
+        with self._lock:
+            for profile in self._thread_profiles:
+                profile.disable()
+                stats.add(profile)
+        return stats
+
+    def summary(self):
+        """
+        Returns the text summary of the hottest functions and the allocation sites holding the most memory.
+        """
+        stats = self.stats()
+        output = io.StringIO()
+        output.write(f"Profiled run of {self.seconds:.1f} seconds, the times of all its threads are added up\n\n")
+        for sort_key, title in (("cumulative", "cumulative time"), ("tottime", "own time")):
+            output.write(f"Top {self.top} functions by {title}\n")
+            stats.stream = output
+            stats.sort_stats(sort_key).print_stats(self.top)
+        if self._snapshot is not None:
+            current, peak = self._traced_memory
+            output.write(f"Traced memory at the end of the run : {current / 1024 / 1024:.1f} MB, "
+                         f"peak : {peak / 1024 / 1024:.1f} MB\n\n")
+            output.write(f"Top {self.top} allocation sites by memory held at the end of the run\n")
+            for statistic in self._snapshot.statistics("lineno")[:self.top]:
+                output.write(f"{statistic}\n")
+        return output.getvalue()
+
+    def write(self, folder_path):
+        """
+        Writes the profile, which can be loaded by pstats or snakeviz, and its summary to the folder.
+
+        :return: list of the written file paths
+        """
+        profile_path = os.path.join(folder_path, PROFILE_FILE_NAME)
+        summary_path = os.path.join(folder_path, PROFILE_SUMMARY_FILE_NAME)
+        self.stats().dump_stats(profile_path)
+        with open(summary_path, "w", encoding="utf-8") as summary_file:
+            summary_file.write(self.summary())
+        return [profile_path, summary_path]
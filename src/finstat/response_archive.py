@@ -0,0 +1,133 @@
+'''
+Raw response archive for the Finstat Extractor
+
+Keeps the raw XML responses of a run in a zip file, one compressed member
+per ICO and request type. The zip directory is the index, so a replay run
+can rebuild the output tables from the archives of previous runs without
+calling the API.
+'''
+
+import glob
+import os
+import zipfile
+
+ARCHIVE_FILE_NAME = "finstat_responses.zip"
+ARCHIVE_FILE_TAG = "finstat_responses"
+DEFAULT_COMPRESS_LEVEL = 6
+
+
+def get_archive_file_name(part=None):
+    """Returns the name of the archive file, the processes of a sharded run each write their own part
+
+            Parameters:
+            part (int): Holds the index of the process, None for a run in a single process
+
+            Returns:
+            file_name (string): Holds the name of the archive file
+    """
+    if part is None:
+        return ARCHIVE_FILE_NAME
+    return ARCHIVE_FILE_NAME.replace(".zip", f"-part-{part}.zip")
+
+
+def find_archive_files(files_in_path):
+    """Finds the archive files of previous runs in the input files
+
+        Keboola prefixes the input files with their file id, the files are
+        returned from the oldest to the most recent one.
+
+            Parameters:
+            files_in_path (string): Holds the path to the input files folder
+
+            Returns:
+            archive_paths (list): Holds the paths of the archive files
+    """
+    def file_id(path):
+        prefix = os.path.basename(path).split("_")[0]
+        return int(prefix) if prefix.isdigit() else 0, os.path.basename(path)
+
+    archive_name = ARCHIVE_FILE_NAME[:-len(".zip")]
+    return sorted(glob.glob(os.path.join(files_in_path, f"*{archive_name}*.zip")), key=file_id)
+
+
+def _member_name(ico, request_type):
+    return f"{request_type}/{ico}.xml"
+
+
+class ResponseArchiveWriter:
+    """
+    Writes the raw responses of a run to a zip archive.
+    """
+
+    def __init__(self, file_path, append=False, compress_level=DEFAULT_COMPRESS_LEVEL):
+        """
+        :param file_path: path of the archive file
+        :param append: keeps the responses of an existing archive, used by runs resumed from a checkpoint
+        :param compress_level: deflate compression level of the members
+        """
+        self.file_path = file_path
+        mode = "a" if append and zipfile.is_zipfile(file_path) else "w"
+        self._zip = zipfile.ZipFile(file_path, mode, compression=zipfile.ZIP_DEFLATED, compresslevel=compress_level)
+        self._names = set(self._zip.namelist())
+        self.count = 0
+
+    def add(self, ico, request_type, response_text):
+        """
+        Archives a response, a response already in the archive is kept.
+        """
+        name = _member_name(ico, request_type)
+        if name in self._names:
+            return
+        self._names.add(name)
+        self._zip.writestr(name, response_text)
+        self.count += 1
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ResponseArchive:
+    """
+    Read only view of several archives, a response is taken from the most recent archive holding it.
+
+    The members are read from shared zip files, so the archive can be used from several threads.
+    """
+
+    def __init__(self, file_paths):
+        """
+        :param file_paths: paths of the archive files, from the oldest to the most recent one
+        """
+        self._zips = [zipfile.ZipFile(file_path) for file_path in file_paths]
+        self._index = {}
+        for archive in self._zips:
+            for name in archive.namelist():
+                self._index[name] = archive
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, ico, request_type):
+        """
+        Returns the archived response text, None if the response is not archived.
+        """
+        name = _member_name(ico, request_type)
+        archive = self._index.get(name)
+        if archive is None:
+            return None
+        return archive.read(name).decode("utf-8")
+
+    def close(self):
+        for archive in self._zips:
+            archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,142 @@
+'''
+Response cache for the Finstat Extractor
+
+Keeps the raw XML responses in a SQLite file keyed by ICO and request type,
+so ICOs fetched by a recent run are not requested from Finstat again.
+'''
+
+import glob
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+CACHE_FILE_NAME = "finstat_cache.sqlite"
+CACHE_FILE_TAG = "finstat_cache"
+
+DEFAULT_MAX_ENTRIES = 200000
+# number of writes committed at once
+COMMIT_EVERY = 500
+# seconds a process sharing the cache file waits for the lock of another one
+SHARED_LOCK_TIMEOUT = 300
+
+INSERT_RESPONSE = "INSERT OR REPLACE INTO responses (ico, request_type, fetched, response) VALUES (?, ?, ?, ?)"
+
+
+def find_cache_file(files_in_path):
+    """Finds the cache file of a previous run in the input files
+
+        Keboola prefixes the input files with their file id,
+        the most recent cache file is returned.
+
+            Parameters:
+            files_in_path (string): Holds the path to the input files folder
+
+            Returns:
+            cache_path (string): Holds the path of the cache file, None if there is none
+    """
+    def file_id(path):
+        prefix = os.path.basename(path).split("_")[0]
+        return int(prefix) if prefix.isdigit() else 0
+
+    cache_files = glob.glob(os.path.join(files_in_path, "*" + CACHE_FILE_NAME))
+    if not cache_files:
+        return None
+    return max(cache_files, key=file_id)
+
+
+class ResponseCache:
+    """
+    Thread safe SQLite cache of raw Finstat responses with a time to live and a maximal number of entries.
+    """
+
+    def __init__(self, path, ttl_seconds, max_entries=DEFAULT_MAX_ENTRIES, clock=time.time, shared=False):
+        """
+        :param path: path of the SQLite file, created if it does not exist
+        :param ttl_seconds: responses older than this are not returned and are removed from the cache
+        :param max_entries: the oldest responses above this count are removed on close
+        :param shared: the file is opened by other processes at the same time, the cleanup on open and close
+                       is left to the process that opened it first without this flag
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._pending_writes = 0
+        self._pending_rows = []
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False,
+                                           timeout=SHARED_LOCK_TIMEOUT if shared else 5.0)
+        if shared:
+            return
+        self._connection.execute("CREATE TABLE IF NOT EXISTS responses ("
+                                 "ico TEXT NOT NULL, request_type TEXT NOT NULL, fetched REAL NOT NULL, "
+                                 "response BLOB NOT NULL, PRIMARY KEY (ico, request_type))")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_fetched ON responses (fetched)")
+        # rows deleted by this connection, the file is only vacuumed on close if there are any
+        self._deleted = self._connection.execute("DELETE FROM responses WHERE fetched < ?",
+                                                 (self._clock() - ttl_seconds,)).rowcount
+        self._connection.commit()
+
+    def get(self, ico, request_type):
+        """
+        Returns the cached response text or None if there is no fresh response.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT response FROM responses "
+                                           "WHERE ico = ? AND request_type = ? AND fetched >= ?",
+                                           (ico, request_type, self._clock() - self.ttl_seconds)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, ico, request_type, response_text):
+        data = zlib.compress(response_text.encode('utf-8'))
+        with self._lock:
+            if self.shared:
+                # an open write transaction would block the other processes, so the writes are sent at once
+                self._pending_rows.append((ico, request_type, self._clock(), data))
+                if len(self._pending_rows) >= COMMIT_EVERY:
+                    self._write_pending_rows()
+                return
+            self._connection.execute(INSERT_RESPONSE, (ico, request_type, self._clock(), data))
+            self._pending_writes += 1
+            if self._pending_writes >= COMMIT_EVERY:
+                self._connection.commit()
+                self._pending_writes = 0
+
+    def _write_pending_rows(self):
+        self._connection.executemany(INSERT_RESPONSE, self._pending_rows)
+        self._connection.commit()
+        self._pending_rows = []
+
+    def close(self):
+        """
+        Commits the pending writes and evicts the oldest responses above max_entries.
+
+        The file is vacuumed, which rewrites all of it, only when responses were deleted.
+        """
+        with self._lock:
+            if self.shared:
+                self._write_pending_rows()
+                self._connection.close()
+                return
+            self._deleted += self._connection.execute("DELETE FROM responses WHERE rowid IN (SELECT rowid FROM "
+                                                      "responses ORDER BY fetched DESC LIMIT -1 OFFSET ?)",
+                                                      (self.max_entries,)).rowcount
+            self._connection.commit()
+            if self._deleted:
+                self._connection.execute("VACUUM")
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,39 @@
+'''
+Request signing for the Finstat Extractor
+
+Every Finstat request carries a SHA-256 hash of the API keys and the ICO.
+The part of the hashed string before the ICO is the same for the whole run,
+so it is hashed once and only the ICO and the suffix are added per request.
+'''
+
+import functools
+import hashlib
+
+HASH_PREFIX = "SomeSalt+{api_key}+{private_key}++"
+HASH_SUFFIX = "+ended"
+# signatures kept for the ICOs signed most recently, e.g. for the other request types of the same ICO
+SIGNATURE_CACHE_SIZE = 4096
+
+
+class Signer:
+    """
+    Computes the Hash parameter of the Finstat requests, the same as the former get_hash kept in benchmarks/legacy.py.
+    """
+
+    def __init__(self, api_key, private_key, cache_size=SIGNATURE_CACHE_SIZE):
+        """
+        :param api_key: the API key of the API user
+        :param private_key: the private key of the API user
+        :param cache_size: number of recent signatures kept, so an ICO signed again is not hashed again
+        """
+        self._prefix = hashlib.sha256(HASH_PREFIX.format(api_key=api_key, private_key=private_key).encode())
+        # lru_cache is thread safe, the signer is shared by the fetch workers
+        self.sign = functools.lru_cache(maxsize=cache_size)(self._sign)
+
+    def _sign(self, ico):
+        """
+        Returns the hex digest of the hash string of the ICO.
+        """
+        hash_object = self._prefix.copy()
+        hash_object.update((ico + HASH_SUFFIX).encode())
+        return hash_object.hexdigest()
@@ -0,0 +1,124 @@
+'''
+Sliced table output for the Finstat Extractor
+
+Writes a table as a directory of gzip compressed csv slices without
+a header, the columns are listed in the table manifest. A new slice
+is started once the current one reaches the row or size limit, so
+storage can import the slices in parallel.
+'''
+
+import csv
+import gzip
+import io
+import os
+
+DEFAULT_SLICE_ROWS = 100000
+DEFAULT_COMPRESS_LEVEL = 6
+
+
+class FinstatSlicedWriter:
+    """
+    Streaming sliced table writer with the same write interface as finstat.finstat_result.FinstatResultWriter.
+
+    The slices are named part-<n>.csv.gz. Rows written before a new column appeared are shorter than the others,
+    the slices holding such rows are rewritten once with the missing values on close.
+    """
+
+    def __init__(self, dir_path, columns=None, max_rows=DEFAULT_SLICE_ROWS, max_bytes=None,
+                 compress_level=DEFAULT_COMPRESS_LEVEL):
+        """
+        :param dir_path: path of the table directory, created if it does not exist
+        :param columns: list of columns known up front, these are written first in the given order
+        :param max_rows: maximal number of rows in a slice
+        :param max_bytes: maximal compressed size of a slice in bytes, checked after every row, so a slice
+            can be larger by the part of the last row the compressor still buffers
+        :param compress_level: gzip compression level
+        """
+        self.dir_path = dir_path
+        self.columns = list(columns or [])
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.rows_written = 0
+        self.file_paths = []
+        self._known_columns = set(self.columns)
+        # number of columns the rows of each closed slice were padded to
+        self._slice_columns = []
+        self._raw_file = None
+        self._file = None
+        self._writer = None
+        self._slice_rows = 0
+        os.makedirs(dir_path, exist_ok=True)
+
+    def write(self, row):
+        """
+        Appends a single row, starting a new slice if the current one is full.
+
+        :param row: dict of column name to value, None values are written as empty strings
+        """
+        for column in row:
+            if column not in self._known_columns:
+                self._known_columns.add(column)
+                self.columns.append(column)
+        if self._file is None:
+            self._open_slice()
+        self._writer.writerow([row.get(column) for column in self.columns])
+        self._slice_rows += 1
+        self.rows_written += 1
+        if self._slice_rows >= self.max_rows or (self.max_bytes and self._raw_file.tell() >= self.max_bytes):
+            self._close_slice()
+
+    def write_all(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def _open_slice(self):
+        path = os.path.join(self.dir_path, f"part-{len(self.file_paths):05d}.csv.gz")
+        self._raw_file = open(path, 'wb')
+        self._file = io.TextIOWrapper(gzip.GzipFile(fileobj=self._raw_file, mode='wb',
+                                                    compresslevel=self.compress_level),
+                                      encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._slice_rows = 0
+        self.file_paths.append(path)
+
+    def _close_slice(self):
+        self._file.close()
+        self._raw_file.close()
+        self._slice_columns.append(len(self.columns))
+        self._raw_file = self._file = self._writer = None
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._close_slice()
+        if not self.file_paths:
+            # an empty slice, so the table is created with its columns even without rows
+            self._open_slice()
+            self._close_slice()
+        for path, column_count in zip(self.file_paths, self._slice_columns):
+            if column_count < len(self.columns):
+                self._pad_slice(path)
+        self._slice_columns = [len(self.columns)] * len(self.file_paths)
+
+    def _pad_slice(self, path):
+        """
+        Rewrites a slice with the rows padded to the full list of columns.
+        """
+        tmp_path = path + '.tmp'
+        column_count = len(self.columns)
+        with gzip.open(path, 'rt', newline='', encoding='utf-8') as src, \
+                gzip.open(tmp_path, 'wt', newline='', encoding='utf-8', compresslevel=self.compress_level) as dst:
+            writer = csv.writer(dst)
+            for row in csv.reader(src):
+                writer.writerow(row + [''] * (column_count - len(row)))
+        os.replace(tmp_path, path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,119 @@
+'''
+Client side throttling for the Finstat API
+
+A token bucket keeps the request rate under the limit of the Finstat plan
+and halves the rate whenever the API signals it is overloaded (429/503),
+then slowly raises it back. The daily budget caps the number of requests
+spent in one day across runs.
+'''
+
+import threading
+import time
+
+# the rate is never throttled below this many requests per second
+MIN_RATE = 0.1
+# share of the configured rate restored after every successful request
+RECOVERY_STEP = 0.05
+
+
+class DailyBudgetExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket rate limiter with additive increase / multiplicative decrease of the rate.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param rate: maximal number of requests per second
+        :param burst: number of requests that may be sent at once after an idle period, defaults to one second of rate
+        """
+        self.max_rate = float(rate)
+        self.rate = self.max_rate
+        self.capacity = float(burst or max(1.0, self.max_rate))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """
+        Takes one token, blocking until it is available.
+        """
+        with self._lock:
+            self._refill()
+            # the token is reserved right away, so concurrent callers queue up behind each other
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            self._sleep(wait)
+
+    def throttle(self):
+        """
+        Halves the current rate, called when the API responds with 429 or 503.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = max(MIN_RATE, self.rate / 2)
+
+    def recover(self):
+        """
+        Raises the current rate back towards the configured maximum, called after a successful request.
+        """
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_STEP)
+
+
+class NoLimit:
+    """
+    Stand-in for TokenBucket when no rate limit is configured.
+    """
+
+    def acquire(self):
+        pass
+
+    def throttle(self):
+        pass
+
+    def recover(self):
+        pass
+
+
+class DailyBudget:
+    """
+    Thread safe counter of the requests sent in a day.
+    """
+
+    def __init__(self, limit=None, day=None, used=0):
+        """
+        :param limit: maximal number of requests per day, None for no limit
+        :param day: ISO date of the day the used requests belong to
+        :param used: number of requests already sent on that day by previous runs
+        """
+        self.limit = limit
+        self.day = time.strftime('%Y-%m-%d')
+        self.used = used if day == self.day else 0
+        self._lock = threading.Lock()
+
+    def spend(self):
+        """
+        Counts one request, raises DailyBudgetExceeded if the limit was already reached.
+        """
+        with self._lock:
+            if self.limit is not None and self.used >= self.limit:
+                raise DailyBudgetExceeded(f'The daily limit of {self.limit} Finstat requests was reached')
+            self.used += 1
+
+    def to_state(self):
+        return {'day': self.day, 'used': self.used}
@@ -0,0 +1,185 @@
+'''
+Single pass parser of the Finstat DetailResult XML
+
+Turns the XML response straight into a flat table row. The keys and values
+are the same as xmltodict.parse followed by flatten_json with the "__"
+delimiter, which the component used before and benchmarks/legacy.py keeps,
+without building the nested dictionaries first.
+'''
+
+import re
+import xml.etree.ElementTree as ET
+
+DELIMITER = "__"
+ATTR_PREFIX = "@"
+TEXT_KEY = "#text"
+
+# the first start tag that is not the XML declaration, a comment or a doctype
+_ROOT_START_TAG = re.compile(r"<(?![?!])[^>]*>")
+_NAMESPACE_DECLARATION = re.compile(r"\sxmlns(?::([^\s=]+))?\s*=\s*([\"'])(.*?)\2")
+
+# names for each set of namespace prefixes, Finstat responses always declare the same ones
+_names_cache = {}
+
+
+class _Names(dict):
+    """
+    Maps the {uri}name names of ElementTree back to the prefix:name form used in the document.
+    """
+
+    def __init__(self, prefixes):
+        super().__init__()
+        self.prefixes = prefixes
+
+    def __missing__(self, name):
+        local_name = name
+        if name[0] == "{":
+            uri, local_name = name[1:].split("}", 1)
+            prefix = self.prefixes.get(uri)
+            if prefix:
+                local_name = prefix + ":" + local_name
+        self[name] = local_name
+        return local_name
+
+
+def _get_names(prefixes):
+    key = tuple(sorted(prefixes.items()))
+    names = _names_cache.get(key)
+    if names is None:
+        names = _names_cache[key] = _Names(prefixes)
+    return names
+
+
+def _text(element, children):
+    # xmltodict joins all character data of the element, including the text after each child
+    pieces = [element.text]
+    pieces.extend(child.tail for child in children)
+    return "".join(piece for piece in pieces if piece).strip()
+
+
+def _attributes(element, names, declarations):
+    attributes = [(ATTR_PREFIX + ("xmlns:" + prefix if prefix else "xmlns"), uri)
+                  for prefix, uri in declarations.get(element, ())]
+    for name, value in element.attrib.items():
+        attributes.append((ATTR_PREFIX + names[name], value))
+    return attributes
+
+
+def _is_leaf(element, declarations):
+    return not element.attrib and not len(element) and element not in declarations
+
+
+def _to_value(element, names, declarations):
+    """
+    Builds the nested value xmltodict would produce for the element, used for repeated elements.
+    """
+    children = list(element)
+    attributes = _attributes(element, names, declarations)
+    text = _text(element, children)
+    if not attributes and not children:
+        return text or None
+    value = dict(attributes)
+    for child in children:
+        tag = names[child.tag]
+        child_value = _to_value(child, names, declarations)
+        if tag not in value:
+            value[tag] = child_value
+        elif isinstance(value[tag], list):
+            value[tag].append(child_value)
+        else:
+            value[tag] = [value[tag], child_value]
+    if text:
+        value[TEXT_KEY] = text
+    return value
+
+
+def _has_text(element, children):
+    if element.text and not element.text.isspace():
+        return True
+    for child in children:
+        if child.tail and not child.tail.isspace():
+            return True
+    return False
+
+
+def _flatten(element, prefix, row, names, declarations):
+    """
+    Writes the flattened content of an element that has attributes or children into the row.
+    """
+    if element.attrib or element in declarations:
+        for name, value in _attributes(element, names, declarations):
+            row[prefix + name] = value
+    children = list(element)
+    tags = [names[child.tag] for child in children]
+    repeated = len(set(tags)) != len(tags)
+    for child, tag in zip(children, tags):
+        key = prefix + tag
+        if repeated and tags.count(tag) > 1:
+            # repeated elements stay a list, as flatten_json does not flatten lists
+            if key not in row:
+                row[key] = [_to_value(item, names, declarations) for item in children if names[item.tag] == tag]
+        elif not len(child) and not child.attrib and child not in declarations:
+            text = child.text
+            row[key] = (text.strip() or None) if text else None
+        else:
+            _flatten(child, key + DELIMITER, row, names, declarations)
+    # whitespace between the children is the common case and is not stored
+    if _has_text(element, children):
+        text = _text(element, children)
+        if text:
+            row[prefix + TEXT_KEY] = text
+
+
+def _parse_root_declarations(response_text):
+    """
+    Parses the document when namespaces are only declared on the root element, which is the case for
+    Finstat responses. Returns None when the document needs the slower _parse_all_declarations.
+    """
+    root_tag = _ROOT_START_TAG.search(response_text)
+    if root_tag is None or response_text.find("xmlns", root_tag.end()) != -1:
+        return None
+    root = ET.fromstring(response_text)
+    declarations = [(prefix, uri) for prefix, _, uri in _NAMESPACE_DECLARATION.findall(root_tag.group())]
+    return root, dict((uri, prefix) for prefix, uri in declarations), {root: declarations} if declarations else {}
+
+
+def _parse_all_declarations(response_text):
+    """
+    Parses the document keeping track of the element declaring each namespace.
+    """
+    parser = ET.XMLPullParser(events=("start-ns", "start"))
+    parser.feed(response_text)
+    prefixes = {}
+    declarations = {}
+    pending = []
+    root = None
+    for event, data in parser.read_events():
+        if event == "start-ns":
+            prefixes[data[1]] = data[0]
+            pending.append(data)
+        else:
+            if root is None:
+                root = data
+            if pending:
+                declarations[data] = pending
+                pending = []
+    parser.close()
+    return root, prefixes, declarations
+
+
+def parse_detail_result(response_text):
+    """Converts the XML response of the API to a flat row
+
+            Parameters:
+            response_text (string): Holds the DetailResult XML
+
+            Returns:
+            row (dict): Holds the flattened response, with nested keys joined by "__"
+    """
+    root, prefixes, declarations = _parse_root_declarations(response_text) or \
+        _parse_all_declarations(response_text)
+
+    row = {}
+    if root is not None and not _is_leaf(root, declarations):
+        _flatten(root, "", row, _get_names(prefixes), declarations)
+    return row
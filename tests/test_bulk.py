@@ -0,0 +1,28 @@
+import unittest
+
+from benchmarks.mock_finstat_server import render_bulk_result, render_detail_result
+from finstat.bulk import get_bulk_endpoint, split_bulk_result
+from finstat.xml_parser import parse_detail_result
+
+
+class TestBulk(unittest.TestCase):
+
+    def test_split_parses_like_single_responses(self):
+        icos = ['35757442', '00151653']
+        for request_type in ['detail', 'ultimate']:
+            responses = split_bulk_result(render_bulk_result(icos, request_type))
+            self.assertEqual(sorted(responses), sorted(icos))
+            for ico in icos:
+                self.assertEqual(parse_detail_result(responses[ico]),
+                                 parse_detail_result(render_detail_result(ico, request_type)))
+
+    def test_empty_bulk_result(self):
+        self.assertEqual(split_bulk_result(render_bulk_result([], 'detail')), {})
+
+    def test_bulk_endpoint(self):
+        self.assertEqual(get_bulk_endpoint('{request_type}/bulk', 'extended'), 'extended/bulk')
+        self.assertEqual(get_bulk_endpoint('bulk', 'extended'), 'bulk')
+
+
+if __name__ == "__main__":
+    unittest.main()
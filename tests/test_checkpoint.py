@@ -0,0 +1,63 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from finstat.checkpoint import Checkpointer
+from finstat.finstat_result import FinstatResultWriter
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'checkpoint.json')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_due_by_count_and_time(self):
+        checkpointer = Checkpointer(self.path, 'run', every=10, interval=60, clock=self.clock)
+        self.assertFalse(checkpointer.is_due(9))
+        self.assertTrue(checkpointer.is_due(10))
+        checkpointer.save(10)
+        self.assertFalse(checkpointer.is_due(11))
+        self.clock.now += 60
+        self.assertTrue(checkpointer.is_due(11))
+
+    def test_load_only_same_fingerprint(self):
+        Checkpointer(self.path, 'run').save(5, response_filename='out.csv')
+        self.assertIsNone(Checkpointer(self.path, 'other run').load())
+        checkpointer = Checkpointer(self.path, 'run')
+        self.assertEqual(checkpointer.load()['response_filename'], 'out.csv')
+        checkpointer.clear()
+        self.assertIsNone(checkpointer.load())
+
+    def test_writer_resumes_after_checkpoint(self):
+        out_path = os.path.join(self.tmp_dir.name, 'out.csv')
+        writer = FinstatResultWriter(out_path)
+        writer.write({'Ico': '1'})
+        state = writer.checkpoint()
+        # rows after the checkpoint are lost with the interrupted run
+        writer.write({'Ico': '2', 'Name': 'B'})
+        writer.flush()
+
+        with FinstatResultWriter(out_path, resume=state) as writer:
+            writer.write({'Ico': '2', 'Name': 'B'})
+        with open(out_path, newline='') as f:
+            self.assertEqual(list(csv.reader(f)), [['Ico', 'Name'], ['1', ''], ['2', 'B']])
+        self.assertEqual(writer.rows_written, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+
+from finstat.column_registry import ColumnRegistry
+from finstat.finstat_result import FinstatResultWriter
+
+
+class TestColumnRegistry(unittest.TestCase):
+
+    def test_update_keeps_known_order(self):
+        registry = ColumnRegistry({'detail': ['Ico', 'Name']})
+        self.assertEqual(registry.update('detail', ['Name', 'Street', 'Ico']), ['Street'])
+        self.assertEqual(registry.update('extended', ['Ico']), ['Ico'])
+        self.assertEqual(registry.to_state(), {'detail': ['Ico', 'Name', 'Street'], 'extended': ['Ico']})
+
+    def test_known_columns_are_written_up_front(self):
+        registry = ColumnRegistry({'detail': ['Ico', 'Name', 'Street']})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'out.csv')
+            with FinstatResultWriter(path, registry.columns('detail')) as writer:
+                writer.write({'Ico': '1', 'Street': 'a'})
+                writer.write({'Name': 'b', 'Ico': '2'})
+            with open(path, encoding='utf-8') as result:
+                self.assertEqual(result.read(), 'Ico,Name,Street\n1,,a\n2,b,\n')
+            self.assertEqual(registry.update('detail', writer.columns), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
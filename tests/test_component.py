@@ -3,12 +3,26 @@ Created on 12. 11. 2018
 
 @author: esner
 '''
+import csv
+import functools
+import gzip
+import json
+import os
+import shutil
+import tempfile
 import unittest
+
 import mock
-import os
 from freezegun import freeze_time
 
-from component import Component
+from benchmarks.mock_finstat_server import MockFinstatServer
+from component import Component, fetch_responses, get_batch_fetcher, get_fetcher, get_json_response, \
+    get_request_types
+from finstat.finstat_client import FinstatApiError, FinstatClient
+from finstat.finstat_result import read_rows
+from finstat.metrics import RunMetrics
+from finstat.response_cache import ResponseCache
+from finstat.signing import Signer
 
 
 class TestComponent(unittest.TestCase):
@@ -22,6 +36,275 @@ class TestComponent(unittest.TestCase):
             comp = Component()
             comp.run()
 
+    def test_request_types_from_list_or_string(self):
+        self.assertEqual(get_request_types("detail"), ["detail"])
+        self.assertEqual(get_request_types("detail, extended,detail"), ["detail", "extended"])
+        self.assertEqual(get_request_types(["ultimate", " detail"]), ["ultimate", "detail"])
+
+    def test_json_response_of_statuses(self):
+        client = mock.Mock(metrics=RunMetrics())
+        client.get_detail.return_value = mock.Mock(status_code=404, text="Not Found")
+        self.assertEqual(get_json_response({"ico": "35757442"}, client, "detail"), (False, "Not Found"))
+        client.get_detail.return_value = mock.Mock(status_code=401, text="Unauthorized")
+        with self.assertRaises(FinstatApiError):
+            get_json_response({"ico": "35757442"}, client, "detail")
+
+
+class TestBatchedFetching(unittest.TestCase):
+
+    def fetch(self, bulk_server, batch_size=None, cache=None):
+        icos = [str(35757442 + i) for i in range(12)] + ['N/A']
+        metrics = RunMetrics()
+        with MockFinstatServer(invalid_rate=0.2, bulk=bulk_server) as server, \
+                FinstatClient(base_url=server.base_url, metrics=metrics) as client:
+            signer = Signer('api', 'private')
+            fetch_ico = get_fetcher(client, cache, 'api', signer, metrics)
+            fetch_batch = get_batch_fetcher(client, cache, 'api', signer, metrics, fetch_ico,
+                                            '{request_type}/bulk') if batch_size else None
+            responses = fetch_responses(icos, ['detail', 'extended'], fetch_ico, 3, fetch_batch, batch_size or 1)
+            return [(request, bool(response), response and response['Name'])
+                    for request, (response, _) in responses], server.request_count
+
+    def test_bulk_and_fallback_match_single_requests(self):
+        single, single_requests = self.fetch(bulk_server=False)
+        bulk, bulk_requests = self.fetch(bulk_server=True, batch_size=5)
+        fallback, _ = self.fetch(bulk_server=False, batch_size=5)
+        self.assertEqual(bulk, single)
+        self.assertEqual(fallback, single)
+        self.assertEqual(single_requests, 24)
+        self.assertEqual(bulk_requests, 6)
+
+    def test_fallback_looks_up_the_cache_once(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(os.path.join(tmp_dir, 'cache.sqlite'), ttl_seconds=3600)
+            try:
+                self.fetch(bulk_server=False, batch_size=5, cache=cache)
+            finally:
+                cache.close()
+        self.assertEqual((cache.hits, cache.misses), (0, 24))
+
+
+class ComponentRunTestCase(unittest.TestCase):
+    """
+    Runs the component against the mock server in a temporary data folder.
+    """
+
+    def setUp(self):
+        self.new_data_folder()
+
+    def new_data_folder(self):
+        """
+        Starts with an empty data folder, the same as every Keboola job does.
+        """
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.data_path = tmp_dir.name
+        for folder in ("in/tables", "in/files", "out/tables", "out/files"):
+            os.makedirs(os.path.join(self.data_path, folder))
+
+    def read_table(self, prefix):
+        """
+        Returns the rows of the csv output table whose name starts with the prefix.
+        """
+        tables_path = os.path.join(self.data_path, "out", "tables")
+        file_names = [file_name for file_name in os.listdir(tables_path)
+                      if file_name.startswith(prefix) and file_name.endswith(".csv")]
+        self.assertEqual(len(file_names), 1, file_names)
+        return list(read_rows(os.path.join(tables_path, file_names[0])))
+
+    def table_path(self, prefix):
+        tables_path = os.path.join(self.data_path, "out", "tables")
+        names = [name for name in os.listdir(tables_path) if name.startswith(prefix) and not name.endswith(".manifest")]
+        self.assertEqual(len(names), 1, names)
+        return os.path.join(tables_path, names[0])
+
+    def read_manifest(self, prefix):
+        with open(self.table_path(prefix) + ".manifest") as manifest_file:
+            return json.load(manifest_file)
+
+    def read_sliced_table(self, prefix):
+        """
+        Returns the rows of the sliced output table whose name starts with the prefix, the columns are in its manifest.
+        """
+        table_path = self.table_path(prefix)
+        columns = self.read_manifest(prefix)["columns"]
+        rows = []
+        for slice_name in sorted(os.listdir(table_path)):
+            with gzip.open(os.path.join(table_path, slice_name), "rt", newline="", encoding="utf-8") as slice_file:
+                rows.extend(dict(zip(columns, values)) for values in csv.reader(slice_file))
+        return rows
+
+    def write_config(self, icos, parameters=None, state=None):
+        with open(os.path.join(self.data_path, "in", "tables", "icos.csv"), "w") as input_file:
+            input_file.write("ico\n" + "".join(f"{ico}\n" for ico in icos))
+        with open(os.path.join(self.data_path, "in", "tables", "icos.csv.manifest"), "w") as manifest_file:
+            json.dump({"id": "in.c-finstat.icos", "columns": ["ico"]}, manifest_file)
+        with open(os.path.join(self.data_path, "config.json"), "w") as config_file:
+            json.dump({"storage": {"input": {"tables": [{"source": "in.c-finstat.icos",
+                                                         "destination": "icos.csv"}]}},
+                       "parameters": dict({"#api_key": "api", "#private_key": "private", "request_type": "detail"},
+                                          **(parameters or {}))}, config_file)
+        with open(os.path.join(self.data_path, "in", "state.json"), "w") as state_file:
+            json.dump(state or {}, state_file)
+
+    def run_component(self, icos, parameters=None, state=None, **server_settings):
+        self.write_config(icos, parameters, state)
+        with MockFinstatServer(**server_settings) as server, \
+                mock.patch.dict(os.environ, {"KBC_DATADIR": self.data_path}), \
+                mock.patch("component.FinstatClient", functools.partial(FinstatClient, base_url=server.base_url,
+                                                                        sleep=lambda seconds: None)):
+            Component().run()
+            self.request_count = server.request_count
+        with open(os.path.join(self.data_path, "out", "state.json")) as state_file:
+            return json.load(state_file)
+
+
+class TestUnprocessedIcos(ComponentRunTestCase):
+
+    def test_fetches_whole_input_when_no_unprocessed_ico_is_in_it(self):
+        state = self.run_component(["35757442", "35757443"], state={"unprocessed_icos": ["99999999"]})
+        self.assertEqual(self.request_count, 2)
+        self.assertNotIn("unprocessed_icos", state)
+
+    def test_continuation_without_rows_clears_the_unprocessed_icos(self):
+        state = self.run_component(["35757442", "35757443"], state={"unprocessed_icos": ["35757443"]},
+                                   invalid_rate=1.0)
+        self.assertEqual(self.request_count, 1)
+        self.assertNotIn("unprocessed_icos", state)
+
+    def test_daily_limit_leaves_the_rest_for_the_next_run(self):
+        icos = [str(35757442 + i) for i in range(6)]
+        state = self.run_component(icos, {"daily_request_limit": 2, "max_workers": 3})
+        self.assertEqual(self.request_count, 2)
+        self.assertEqual(state["unprocessed_icos"], icos[2:])
+
+    def test_next_job_continues_after_an_outage(self):
+        icos = [str(35757442 + i) for i in range(10)]
+        # the first job fetches 4 ICOs, the 5th keeps failing
+        state = self.run_component(icos, {"checkpoint_every": 1}, outage_after=4)
+        self.assertEqual(state["unprocessed_icos"], icos[4:])
+        first_rows = self.read_table("finstat-out")
+        # a Keboola job gets a new data folder, only the state of the previous job is kept
+        self.new_data_folder()
+        state = self.run_component(icos, {"checkpoint_every": 1}, state=state)
+        self.assertEqual(self.request_count, 6)
+        self.assertNotIn("unprocessed_icos", state)
+        second_rows = self.read_table("finstat-out")
+        self.assertEqual([row["Ico"] for row in first_rows + second_rows], icos)
+
+    def test_outage_before_any_ico_fails_the_run(self):
+        with self.assertRaises(SystemExit):
+            self.run_component(["35757442"], outage_after=0)
+
+
+class TestRequestTypes(ComponentRunTestCase):
+
+    def test_one_table_per_request_type(self):
+        icos = ["35757442", "35757443", "35757444", "N/A"]
+        self.run_component(icos, {"request_type": "detail, extended", "max_workers": 2},
+                           unavailable={"extended": ["35757443"]})
+        detail_rows = self.read_table("finstat-detail-out")
+        extended_rows = self.read_table("finstat-extended-out")
+        self.assertEqual([row["Ico"] for row in detail_rows], icos[:3])
+        self.assertEqual([row["Ico"] for row in extended_rows], ["35757442", "35757444"])
+        self.assertNotEqual(set(extended_rows[0]) - set(detail_rows[0]), set())
+        self.assertEqual(self.read_table("finstat-bad-ico-out"),
+                         [{"unavailable_ico": "35757443", "unavailable_request_types": "extended"},
+                          {"unavailable_ico": "N/A", "unavailable_request_types": "detail,extended"}])
+        self.assertEqual(self.request_count, 6)
+
+
+class TestProcesses(ComponentRunTestCase):
+
+    def test_processes_write_the_rows_of_a_single_process_run(self):
+        icos = [str(35757442 + i) for i in range(20)] + ["N/A"]
+        self.run_component(icos, {"max_workers": 2}, invalid_rate=0.2)
+        rows, bad_rows, request_count = self.read_table("finstat-out"), self.read_table("finstat-bad-ico-out"), \
+            self.request_count
+        self.new_data_folder()
+        self.run_component(icos, {"max_workers": 2, "processes": 2}, invalid_rate=0.2)
+        # the rows are grouped by process, so only their multisets are the same
+        self.assertCountEqual(self.read_table("finstat-out"), rows)
+        self.assertCountEqual(self.read_table("finstat-bad-ico-out"), bad_rows)
+        self.assertGreater(len(bad_rows), 1)
+        self.assertEqual(self.request_count, request_count)
+
+
+class TestSlicedOutput(ComponentRunTestCase):
+
+    def test_sliced_tables_match_the_csv_tables(self):
+        icos = [str(35757442 + i) for i in range(10)] + ["N/A"]
+        self.run_component(icos, invalid_rate=0.2)
+        rows, bad_rows = self.read_table("finstat-out"), self.read_table("finstat-bad-ico-out")
+        self.new_data_folder()
+        self.run_component(icos, {"output_format": "sliced_csv", "slice_rows": 3}, invalid_rate=0.2)
+        self.assertEqual(len(os.listdir(self.table_path("finstat-out"))), -(-len(rows) // 3))
+        self.assertEqual(self.read_manifest("finstat-out")["columns"], list(rows[0]))
+        self.assertEqual(self.read_sliced_table("finstat-out"), rows)
+        self.assertEqual(self.read_manifest("finstat-bad-ico-out")["columns"], ["unavailable_ico"])
+        self.assertEqual(self.read_sliced_table("finstat-bad-ico-out"), bad_rows)
+
+
+class TestReplay(ComponentRunTestCase):
+
+    def test_replay_rebuilds_the_tables_without_requests(self):
+        icos = [str(35757442 + i) for i in range(10)] + ["N/A"]
+        self.run_component(icos, {"archive_responses": True}, invalid_rate=0.2)
+        rows, bad_rows = self.read_table("finstat-out"), self.read_table("finstat-bad-ico-out")
+        archive_path = os.path.join(self.data_path, "out", "files", "finstat_responses.zip")
+        with open(archive_path + ".manifest") as manifest_file:
+            self.assertIn("finstat_responses", json.load(manifest_file)["tags"])
+        self.new_data_folder()
+        # the file input mapping prefixes the archive with its file id
+        shutil.copy(archive_path, os.path.join(self.data_path, "in", "files", "123_finstat_responses.zip"))
+        self.run_component(icos, {"replay": True})
+        self.assertEqual(self.request_count, 0)
+        self.assertCountEqual(self.read_table("finstat-out"), rows)
+        self.assertCountEqual(self.read_table("finstat-bad-ico-out"), bad_rows)
+
+
+class TestChangedOnly(ComponentRunTestCase):
+
+    def test_only_new_and_changed_companies_are_written(self):
+        icos = [str(35757442 + i) for i in range(5)]
+        parameters = {"changed_only": True, "unchanged_summary": True}
+        state = self.run_component(icos, parameters)
+        self.assertEqual(len(self.read_table("finstat-out.csv")), 5)
+        manifest = self.read_manifest("finstat-out.csv")
+        self.assertEqual((manifest["primary_key"], manifest["incremental"]), (["Ico"], True))
+        self.assertEqual(self.read_table("finstat-unchanged-summary"),
+                         [{"request_type": "detail", "new": "5", "changed": "0", "unchanged": "0"}])
+        self.new_data_folder()
+        self.run_component(icos + ["35757450"], parameters, state=state)
+        self.assertEqual([row["Ico"] for row in self.read_table("finstat-out.csv")], ["35757450"])
+        self.assertEqual(self.read_table("finstat-unchanged-summary"),
+                         [{"request_type": "detail", "new": "1", "changed": "0", "unchanged": "5"}])
+
+
+class TestRunFingerprint(ComponentRunTestCase):
+
+    def fingerprint(self, icos, parameters=None, unprocessed_icos=None):
+        self.write_config(icos, parameters)
+        with mock.patch.dict(os.environ, {"KBC_DATADIR": self.data_path}):
+            component = Component()
+        return component._get_run_fingerprint(os.path.join(self.data_path, "in", "tables", "icos.csv"),
+                                              ["detail"], unprocessed_icos)
+
+    def test_same_input_and_parameters_give_same_fingerprint(self):
+        self.assertEqual(self.fingerprint(["35757442", "35757443"], {"changed_only": True}),
+                         self.fingerprint(["35757442", "35757443"], {"changed_only": True}))
+
+    def test_input_of_same_size_changes_fingerprint(self):
+        self.assertNotEqual(self.fingerprint(["35757442", "35757443"]),
+                            self.fingerprint(["35757443", "35757442"]))
+
+    def test_output_parameters_change_fingerprint(self):
+        fingerprint = self.fingerprint(["35757442"])
+        for parameters in ({"changed_only": True}, {"keep_duplicate_icos": True}, {"bulk_endpoint": True},
+                           {"max_runtime": 60}, {"output_format": "sliced_csv"}):
+            self.assertNotEqual(self.fingerprint(["35757442"], parameters), fingerprint, parameters)
+        self.assertNotEqual(self.fingerprint(["35757442"], unprocessed_icos=["35757442"]), fingerprint)
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+from finstat.content_hash import ChangedRowsWriter, ContentHashes, hash_row
+from finstat.finstat_result import FinstatResultWriter, read_rows
+
+
+class TestContentHashes(unittest.TestCase):
+
+    def test_hash_ignores_empty_values_and_order(self):
+        self.assertEqual(hash_row({'Ico': '1', 'Name': 'A', 'Phones': None}), hash_row({'Name': 'A', 'Ico': '1'}))
+        self.assertNotEqual(hash_row({'Ico': '1', 'Name': 'A'}), hash_row({'Ico': '1', 'Name': 'B'}))
+
+    def test_only_changed_rows_are_written(self):
+        previous = ContentHashes()
+        previous.is_changed('detail', '1', {'Ico': '1', 'Name': 'A'})
+        previous.is_changed('detail', '2', {'Ico': '2', 'Name': 'B'})
+        previous.is_changed('detail', '3', {'Ico': '3', 'Name': 'C'})
+        content_hashes = ContentHashes(previous.to_state())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'out.csv')
+            with ChangedRowsWriter(FinstatResultWriter(path), content_hashes, 'detail') as writer:
+                writer.write_all([{'Ico': '1', 'Name': 'A'}, {'Ico': '2', 'Name': 'B2'}, {'Ico': '4', 'Name': 'D'}])
+            self.assertEqual(writer.rows_written, 2)
+            self.assertEqual([row['Ico'] for row in read_rows(path)], ['2', '4'])
+        self.assertEqual(content_hashes.summary(),
+                         [{'request_type': 'detail', 'new': 1, 'changed': 1, 'unchanged': 1}])
+        # the ICO not fetched by this run keeps its hash
+        self.assertEqual(sorted(content_hashes.to_state()['detail']), ['1', '2', '3', '4'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import time
+import unittest
+
+from finstat.fetcher import Deadline, fetch_ordered
+
+
+def slow_square(number):
+    # later items finish first to make sure the output is reordered
+    time.sleep((10 - number) * 0.001)
+    return number * number
+
+
+class TestFetcher(unittest.TestCase):
+
+    def test_sequential_keeps_order(self):
+        results = list(fetch_ordered(slow_square, range(10)))
+        self.assertEqual(results, [(i, i * i) for i in range(10)])
+
+    def test_thread_pool_keeps_order(self):
+        results = list(fetch_ordered(slow_square, iter(range(10)), max_workers=4))
+        self.assertEqual(results, [(i, i * i) for i in range(10)])
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_stops_taking_items_after_the_deadline(self):
+        clock = FakeClock()
+        deadline = Deadline(1010.0, clock=clock)
+        items = iter(range(10))
+        taken = []
+        for item in deadline.until(items):
+            taken.append(item)
+            clock.now += 4
+        self.assertTrue(deadline.passed)
+        self.assertEqual(taken, [0, 1, 2])
+        # the items after the deadline stay in the iterator
+        self.assertEqual(list(items), list(range(3, 10)))
+
+    def test_in_flight_items_are_drained(self):
+        clock = FakeClock()
+        deadline = Deadline(1001.0, clock=clock)
+        items = iter(range(20))
+
+        def fetch(number):
+            clock.now += 1
+            return number
+
+        results = list(fetch_ordered(fetch, deadline.until(items), max_workers=2))
+        # the items submitted before the deadline are all returned in order
+        self.assertEqual([item for item, _ in results], list(range(len(results))))
+        self.assertEqual(list(items), list(range(len(results), 20)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import mock
+import requests
+
+from benchmarks.mock_finstat_server import MockFinstatServer
+from finstat.finstat_client import MAX_TRANSIENT_RETRIES, FinstatApiError, FinstatClient
+from finstat.metrics import RunMetrics
+from finstat.throttling import DailyBudget, DailyBudgetExceeded
+
+
+class CountingLimiter:
+
+    def __init__(self):
+        self.acquired = 0
+        self.throttled = 0
+        self.recovered = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+    def throttle(self):
+        self.throttled += 1
+
+    def recover(self):
+        self.recovered += 1
+
+
+class TestFinstatClient(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        self.limiter = CountingLimiter()
+        self.metrics = RunMetrics()
+
+    def get_detail(self, server, ico="35757442", **client_settings):
+        with FinstatClient(base_url=server.base_url, rate_limiter=self.limiter, metrics=self.metrics,
+                           sleep=self.sleeps.append, **client_settings) as client:
+            return client.get_detail("detail", {"ico": ico})
+
+    def test_throttling_is_retried_and_slows_down(self):
+        with MockFinstatServer(throttle_rate=0.5, seed=3) as server:
+            responses = [self.get_detail(server) for _ in range(10)]
+            request_count = server.request_count
+        self.assertEqual([response.status_code for response in responses], [200] * 10)
+        self.assertGreater(self.limiter.throttled, 0)
+        self.assertEqual(self.limiter.throttled, self.metrics.counters["http_throttled"])
+        self.assertEqual(request_count, 10 + self.limiter.throttled)
+        # the server asks to retry after 1 second
+        self.assertEqual(self.sleeps, [1] * self.limiter.throttled)
+
+    def test_server_errors_are_retried_until_they_give_up(self):
+        with MockFinstatServer(error_rate=1) as server:
+            with self.assertRaises(FinstatApiError):
+                self.get_detail(server)
+            self.assertEqual(server.request_count, MAX_TRANSIENT_RETRIES + 1)
+        self.assertEqual(len(self.sleeps), MAX_TRANSIENT_RETRIES)
+        # 503 is an overload signal, the rate is lowered as for 429
+        self.assertEqual(self.limiter.throttled, MAX_TRANSIENT_RETRIES + 1)
+
+    def test_invalid_ico_is_not_retried(self):
+        with MockFinstatServer(invalid_rate=1) as server:
+            response = self.get_detail(server)
+            self.assertEqual(server.request_count, 1)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.sleeps, [])
+
+    def test_connection_errors_are_retried(self):
+        with MockFinstatServer() as server, \
+                FinstatClient(base_url=server.base_url, metrics=self.metrics, sleep=self.sleeps.append) as client:
+            get_raw = client.get_raw
+            failures = [requests.ConnectionError("refused"), requests.Timeout("timed out")]
+
+            def flaky_get_raw(*args, **kwargs):
+                if failures:
+                    raise failures.pop(0)
+                return get_raw(*args, **kwargs)
+
+            with mock.patch.object(client, "get_raw", flaky_get_raw):
+                response = client.get_detail("detail", {"ico": "35757442"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.metrics.counters["http_connection_errors"], 2)
+        self.assertEqual(self.sleeps, [1, 2])
+
+    def test_other_statuses_are_returned_without_retry(self):
+        with MockFinstatServer() as server, \
+                FinstatClient(base_url=server.base_url, sleep=self.sleeps.append) as client:
+            response = client.get_detail("unknown", {"ico": "35757442"})
+            self.assertEqual(server.request_count, 1)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.sleeps, [])
+
+    def test_daily_budget_stops_requests(self):
+        daily_budget = DailyBudget(1)
+        with MockFinstatServer() as server, \
+                FinstatClient(base_url=server.base_url, daily_budget=daily_budget) as client:
+            client.get_detail("detail", {"ico": "35757442"})
+            with self.assertRaises(DailyBudgetExceeded):
+                client.get_detail("detail", {"ico": "35757443"})
+            self.assertEqual(server.request_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
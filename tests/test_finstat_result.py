@@ -0,0 +1,60 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from finstat.finstat_result import FinstatResultWriter, read_rows
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+class TestFinstatResultWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'out.csv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_fixed_header(self):
+        with FinstatResultWriter(self.path, ['Ico', 'Name']) as writer:
+            writer.write({'Ico': '123', 'Name': 'A, s.r.o.'})
+            writer.write({'Ico': '456', 'Name': None})
+        self.assertEqual(read_csv(self.path), [['Ico', 'Name'], ['123', 'A, s.r.o.'], ['456', '']])
+        self.assertEqual(writer.rows_written, 2)
+
+    def test_new_columns_rewrite_header(self):
+        with FinstatResultWriter(self.path) as writer:
+            writer.write({'Ico': '123', 'Name': 'A'})
+            writer.write({'Ico': '456', 'Address__City': 'Bratislava', 'Name': 'B'})
+            writer.write({'Name': 'C'})
+        self.assertEqual(read_csv(self.path), [['Ico', 'Name', 'Address__City'],
+                                               ['123', 'A', ''],
+                                               ['456', 'B', 'Bratislava'],
+                                               ['', 'C', '']])
+
+    def test_empty_output_has_header(self):
+        with FinstatResultWriter(self.path, ['unavailable_ico']):
+            pass
+        self.assertEqual(read_csv(self.path), [['unavailable_ico']])
+
+    def test_read_rows_merges_into_writer(self):
+        slice_path = os.path.join(self.tmp_dir.name, 'slice.csv')
+        with FinstatResultWriter(slice_path) as writer:
+            writer.write({'Ico': '123', 'Name': 'A'})
+            writer.write({'Ico': '456', 'Address__City': 'Bratislava'})
+        with FinstatResultWriter(self.path, ['Ico', 'Name']) as writer:
+            writer.write({'Ico': '789', 'Name': 'C'})
+            writer.write_all(read_rows(slice_path))
+        self.assertEqual(read_csv(self.path), [['Ico', 'Name', 'Address__City'],
+                                               ['789', 'C', ''],
+                                               ['123', 'A', ''],
+                                               ['456', '', 'Bratislava']])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import threading
+import unittest
+
+import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "example"))
+
+from hs import hs_client  # noqa: E402
+from hs.hs_client import _prefetch  # noqa: E402
+
+
+class FakePages:
+    """
+    Page iterator recording how many pages were requested, failing at the given page.
+    """
+
+    def __init__(self, count=None, fail_at=None):
+        self.count = count
+        self.fail_at = fail_at
+        self.requested = 0
+
+    def __iter__(self):
+        while self.count is None or self.requested < self.count:
+            if self.requested == self.fail_at:
+                raise ValueError(f"page {self.requested} failed")
+            self.requested += 1
+            yield self.requested - 1
+
+
+def prefetch_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'hubspot-prefetch']
+
+
+@mock.patch.object(hs_client, 'PREFETCH_POLL_SECONDS', 0.01)
+class TestPrefetch(unittest.TestCase):
+
+    def test_pages_keep_their_order(self):
+        self.assertEqual(list(_prefetch(iter(FakePages(count=20)), 3)), list(range(20)))
+
+    def test_error_is_raised_at_the_failed_page(self):
+        pages = _prefetch(iter(FakePages(count=10, fail_at=4)), 2)
+        self.assertEqual([next(pages) for _ in range(4)], [0, 1, 2, 3])
+        with self.assertRaisesRegex(ValueError, "page 4 failed"):
+            next(pages)
+
+    def test_close_stops_the_thread(self):
+        fake_pages = FakePages()
+        pages = _prefetch(iter(fake_pages), 2)
+        self.assertEqual([next(pages) for _ in range(3)], [0, 1, 2])
+        pages.close()
+        self.assertEqual(prefetch_threads(), [])
+        # the pages taken, the full queue and the page waiting to be put
+        self.assertLessEqual(fake_pages.requested, 3 + 2 + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from finstat.ico_reader import get_ico_multiplicity, get_icos_from_file, is_valid_ico, normalize_ico
+
+
+class TestIcoReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'icos.csv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_input(self, content):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_reads_ico_column_as_strings(self):
+        self.write_input('name,ico\nA,00151653\nB," 35757442 "\nC,00151653\nD,\n')
+        self.assertEqual(list(get_icos_from_file(self.path)), ['00151653', '35757442'])
+
+    def test_falls_back_to_first_column(self):
+        self.write_input('company_id,name\n31333532,A\n35757442,B\n')
+        self.assertEqual(list(get_icos_from_file(self.path)), ['31333532', '35757442'])
+
+    def test_normalizes_before_dedup(self):
+        self.write_input('ico\n151653\n00151653\n151653.0\n35 757 442\n3.5757442E7\nN/A\n123456789\n')
+        self.assertEqual(list(get_icos_from_file(self.path)), ['00151653', '35757442', 'N/A', '123456789'])
+
+    def test_malformed_icos(self):
+        self.assertEqual(normalize_ico(' 1.5 '), '1.5')
+        self.assertTrue(is_valid_ico(normalize_ico('151653')))
+        self.assertFalse(is_valid_ico(normalize_ico('1.5')))
+        self.assertFalse(is_valid_ico(normalize_ico('123456789')))
+        self.assertFalse(is_valid_ico(normalize_ico('SK35757442')))
+
+    def test_multiplicity_of_repeated_icos(self):
+        self.write_input('ico\n151653\n35757442\n00151653\n151653.0\n')
+        self.assertEqual(get_ico_multiplicity(self.path), {'00151653': 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
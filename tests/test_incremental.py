@@ -0,0 +1,21 @@
+import unittest
+from datetime import date
+
+from finstat.incremental import FetchLog
+
+
+class TestFetchLog(unittest.TestCase):
+
+    def test_skips_recently_fetched_icos(self):
+        fetch_log = FetchLog({'1': '2010-10-09', '2': '2010-09-01'}, refresh_days=30, today=date(2010, 10, 10))
+        self.assertEqual(list(filter(fetch_log.needs_fetch, ['1', '2', '3'])), ['2', '3'])
+        self.assertEqual(fetch_log.skipped, 1)
+
+    def test_state_keeps_only_refresh_window(self):
+        fetch_log = FetchLog({'1': '2010-10-09', '2': '2010-09-01'}, refresh_days=30, today=date(2010, 10, 10))
+        fetch_log.record('3')
+        self.assertEqual(fetch_log.to_state(), {'1': '2010-10-09', '3': '2010-10-10'})
+
+
+if __name__ == "__main__":
+    unittest.main()
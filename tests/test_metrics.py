@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+import unittest
+
+from finstat.metrics import Histogram, RunMetrics, count_input_rows
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram()
+        for seconds in [0.003] * 90 + [0.4] * 10:
+            histogram.observe(seconds)
+        self.assertEqual(histogram.percentile(0.5), 5)
+        self.assertEqual(histogram.percentile(0.95), 500)
+        self.assertEqual(histogram.to_dict()["count"], 100)
+
+    def test_progress_and_metrics_file(self):
+        clock = FakeClock()
+        metrics = RunMetrics(total_estimate=100, progress_interval=10, clock=clock)
+        for i in range(20):
+            metrics.ico_processed(ok=i % 4 != 0)
+        metrics.observe("http", 0.05)
+        clock.now = 10
+        self.assertEqual(metrics.progress_line(),
+                         "Processed 20 ICOs, 2.0 ICOs/s, 25.0% invalid, about 80 remaining, ETA 40s")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "metrics.json")
+            metrics.write(path)
+            with open(path) as f:
+                result = json.load(f)
+        self.assertEqual(result["counters"], {"icos_processed": 20, "icos_ok": 15, "icos_invalid": 5})
+        self.assertEqual(result["stages"]["http"]["p50_ms"], 50)
+
+    def test_count_input_rows(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "icos.csv")
+            with open(path, "w") as f:
+                f.write("ico\n1\n2\n3\n")
+            self.assertEqual(count_input_rows(path), 3)
+
+    def test_merge_shard_metrics(self):
+        metrics = RunMetrics()
+        metrics.ico_processed(ok=True)
+        metrics.observe("http", 0.05)
+        shard = RunMetrics()
+        shard.ico_processed(ok=False)
+        shard.observe("http", 0.4)
+        shard.observe("parse", 0.001)
+        metrics.merge(shard.counters, shard.stages)
+        self.assertEqual(metrics.counters, {"icos_processed": 2, "icos_ok": 1, "icos_invalid": 1})
+        self.assertEqual(metrics.stages["http"].count, 2)
+        self.assertEqual(metrics.stages["http"].percentile(1), 500)
+        self.assertEqual(metrics.stages["parse"].count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+import requests
+
+from benchmarks.mock_finstat_server import MockFinstatServer, is_invalid_ico
+from finstat.xml_parser import parse_detail_result
+
+
+class TestMockFinstatServer(unittest.TestCase):
+
+    def test_serves_parsable_detail_results(self):
+        with MockFinstatServer() as server:
+            columns = {}
+            for request_type in ["detail", "extended", "ultimate"]:
+                response = requests.get(server.base_url + request_type, params={"ico": "35757442"})
+                self.assertEqual(response.status_code, 200)
+                row = parse_detail_result(response.text)
+                self.assertEqual(row["Ico"], "35757442")
+                columns[request_type] = len(row)
+        self.assertLess(columns["detail"], columns["extended"])
+        self.assertLess(columns["extended"], columns["ultimate"])
+
+    def test_invalid_icos_and_throttling(self):
+        invalid_ico = next(f"{i:08d}" for i in range(1000) if is_invalid_ico(f"{i:08d}", 0.5))
+        with MockFinstatServer(invalid_rate=0.5) as server:
+            response = requests.get(server.base_url + "detail", params={"ico": invalid_ico})
+            self.assertEqual(response.status_code, 404)
+        with MockFinstatServer(throttle_rate=1) as server:
+            response = requests.get(server.base_url + "detail", params={"ico": "35757442"})
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.headers["Retry-After"], "1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from benchmarks.mock_finstat_server import render_detail_result
+from finstat.parquet_writer import FinstatParquetWriter
+from finstat.xml_parser import parse_detail_result
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+class TestFinstatParquetWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'out.parquet')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_typed_row_groups(self):
+        with FinstatParquetWriter(self.path, row_group_size=2) as writer:
+            writer.write_all([
+                {'Ico': '00151653', 'Revenue': '1043557000', 'HasDebt': 'false', 'Created': '1994-01-01T00:00:00',
+                 'BasicCapital__@currency': 'EUR', 'BasicCapital__#text': '212000000'},
+                {'Ico': '35757442', 'Revenue': None, 'HasDebt': 'true', 'Created': None},
+                {'Ico': '31333532', 'Revenue': 'n/a', 'HasDebt': 'false', 'Created': '2005-03-01T00:00:00'},
+            ])
+        parquet_file = pq.ParquetFile(self.path)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        schema = parquet_file.schema_arrow
+        self.assertEqual(str(schema.field('Ico').type), 'string')
+        self.assertEqual(str(schema.field('Revenue').type), 'double')
+        self.assertEqual(str(schema.field('BasicCapital__#text').type), 'double')
+        self.assertEqual(str(schema.field('HasDebt').type), 'bool')
+        table = parquet_file.read().to_pydict()
+        self.assertEqual(table['Ico'], ['00151653', '35757442', '31333532'])
+        self.assertEqual(table['Revenue'], [1043557000.0, None, None])
+        self.assertEqual(table['Created'][0], datetime(1994, 1, 1))
+        self.assertEqual(writer.file_paths, [self.path])
+
+    def test_new_columns_start_a_new_part(self):
+        with FinstatParquetWriter(self.path, row_group_size=1) as writer:
+            writer.write({'Ico': '1'})
+            writer.write({'Ico': '2', 'Name': 'B'})
+        self.assertEqual([os.path.basename(path) for path in writer.file_paths],
+                         ['out.parquet', 'out-part-1.parquet'])
+        self.assertEqual(pq.read_table(writer.file_paths[1]).to_pydict(), {'Ico': ['2'], 'Name': ['B']})
+
+    def test_ultimate_financials_are_numbers(self):
+        rows = [parse_detail_result(render_detail_result(ico, "ultimate")) for ico in ("35757442", "35757443")]
+        with FinstatParquetWriter(self.path) as writer:
+            writer.write_all(rows)
+        schema = pq.ParquetFile(self.path).schema_arrow
+        financial_columns = [column for column in rows[0] if column.startswith("Financials__")]
+        self.assertGreater(len(financial_columns), 100)
+        for column in financial_columns:
+            self.assertEqual(str(schema.field(column).type), 'double', column)
+        self.assertEqual(str(schema.field('Ico').type), 'string')
+        table = pq.read_table(self.path).to_pydict()
+        self.assertEqual(table['Financials__Year2019__EBITDA'][0], float(rows[0]['Financials__Year2019__EBITDA']))
+
+    def test_financial_column_with_text_stays_string(self):
+        with FinstatParquetWriter(self.path) as writer:
+            writer.write_all([{'Financials__Note': '12'}, {'Financials__Note': 'restated'}])
+        self.assertEqual(pq.read_table(self.path).to_pydict(), {'Financials__Note': ['12', 'restated']})
+
+    def test_column_type_is_kept_in_later_parts(self):
+        with FinstatParquetWriter(self.path, row_group_size=1) as writer:
+            writer.write({'Financials__Year2019__Assets': '10'})
+            writer.write({'Financials__Year2019__Assets': 'n/a', 'Ico': '1'})
+        self.assertEqual(pq.read_table(writer.file_paths[1]).to_pydict(),
+                         {'Financials__Year2019__Assets': [None], 'Ico': ['1']})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import pstats
+import tempfile
+import threading
+import unittest
+
+from finstat.profiling import PROFILE_FILE_NAME, PROFILE_SUMMARY_FILE_NAME, RunProfiler
+
+
+def build_rows(count):
+    return [{"Ico": str(number).zfill(8)} for number in range(count)]
+
+
+def build_rows_in_thread(count):
+    thread = threading.Thread(target=build_rows, args=(count,))
+    thread.start()
+    thread.join()
+
+
+class TestRunProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_profiles_the_started_threads(self):
+        profiler = RunProfiler(top=5)
+        profiler.start()
+        try:
+            rows = build_rows(1000)
+            build_rows_in_thread(1000)
+        finally:
+            profiler.stop()
+        calls = {function[2]: stat[1] for function, stat in profiler.stats().stats.items()}
+        self.assertEqual(calls["build_rows"], 2)
+        self.assertEqual(len(rows), 1000)
+
+    def test_writes_profile_and_summary(self):
+        profiler = RunProfiler(top=5)
+        profiler.start()
+        try:
+            build_rows(1000)
+        finally:
+            profiler.stop()
+        paths = profiler.write(self.tmp_dir.name)
+        self.assertEqual([os.path.basename(path) for path in paths], [PROFILE_FILE_NAME, PROFILE_SUMMARY_FILE_NAME])
+        self.assertTrue(pstats.Stats(paths[0]).stats)
+        with open(paths[1], encoding="utf-8") as summary_file:
+            summary = summary_file.read()
+        self.assertIn("Top 5 functions by cumulative time", summary)
+        self.assertIn("Top 5 functions by own time", summary)
+        self.assertIn("Top 5 allocation sites", summary)
+        self.assertIn("build_rows", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
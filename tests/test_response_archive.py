@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from finstat.response_archive import ResponseArchive, ResponseArchiveWriter, find_archive_files, \
+    get_archive_file_name
+
+
+class TestResponseArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'responses.zip')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_write_and_read(self):
+        with ResponseArchiveWriter(self.path) as writer:
+            writer.add('35757442', 'detail', '<DetailResult>Škoda</DetailResult>')
+            writer.add('35757442', 'extended', '<DetailResult>extended</DetailResult>')
+            writer.add('35757442', 'detail', '<DetailResult>again</DetailResult>')
+        self.assertEqual(writer.count, 2)
+        with ResponseArchive([self.path]) as archive:
+            self.assertEqual(len(archive), 2)
+            self.assertEqual(archive.get('35757442', 'detail'), '<DetailResult>Škoda</DetailResult>')
+            self.assertEqual(archive.get('35757442', 'extended'), '<DetailResult>extended</DetailResult>')
+            self.assertIsNone(archive.get('35757442', 'ultimate'))
+            self.assertIsNone(archive.get('00151653', 'detail'))
+
+    def test_append_keeps_archived_responses(self):
+        with ResponseArchiveWriter(self.path) as writer:
+            writer.add('1', 'detail', 'first')
+        with ResponseArchiveWriter(self.path, append=True) as writer:
+            writer.add('1', 'detail', 'repeated')
+            writer.add('2', 'detail', 'second')
+        self.assertEqual(writer.count, 1)
+        with ResponseArchive([self.path]) as archive:
+            self.assertEqual((archive.get('1', 'detail'), archive.get('2', 'detail')), ('first', 'second'))
+
+    def test_most_recent_archive_wins(self):
+        old_path = os.path.join(self.tmp_dir.name, '100_' + get_archive_file_name())
+        new_path = os.path.join(self.tmp_dir.name, '200_' + get_archive_file_name(0))
+        with ResponseArchiveWriter(new_path) as writer:
+            writer.add('1', 'detail', 'new')
+        with ResponseArchiveWriter(old_path) as writer:
+            writer.add('1', 'detail', 'old')
+            writer.add('2', 'detail', 'old')
+        open(os.path.join(self.tmp_dir.name, '300_other.zip'), 'w').close()
+        archive_paths = find_archive_files(self.tmp_dir.name)
+        self.assertEqual(archive_paths, [old_path, new_path])
+        with ResponseArchive(archive_paths) as archive:
+            self.assertEqual((archive.get('1', 'detail'), archive.get('2', 'detail')), ('new', 'old'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from finstat.response_cache import ResponseCache, find_cache_file
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'cache.sqlite')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hit_miss_and_ttl(self):
+        with ResponseCache(self.path, 100, clock=self.clock) as cache:
+            self.assertIsNone(cache.get('35757442', 'detail'))
+            cache.put('35757442', 'detail', '<DetailResult/>')
+            self.assertEqual(cache.get('35757442', 'detail'), '<DetailResult/>')
+            self.assertIsNone(cache.get('35757442', 'extended'))
+            self.clock.now += 101
+            self.assertIsNone(cache.get('35757442', 'detail'))
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_persists_and_evicts_oldest(self):
+        with ResponseCache(self.path, 100, max_entries=2, clock=self.clock) as cache:
+            for ico in ['1', '2', '3']:
+                self.clock.now += 1
+                cache.put(ico, 'detail', ico)
+        with ResponseCache(self.path, 100, clock=self.clock) as cache:
+            self.assertIsNone(cache.get('1', 'detail'))
+            self.assertEqual(cache.get('3', 'detail'), '3')
+
+    def test_vacuums_only_after_deleting(self):
+        for max_entries, vacuumed in ((2, False), (1, True)):
+            statements = []
+            cache = ResponseCache(self.path, 100, max_entries=max_entries, clock=self.clock)
+            cache._connection.set_trace_callback(statements.append)
+            cache.put('1', 'detail', '1')
+            self.clock.now += 1
+            cache.put('2', 'detail', '2')
+            cache.close()
+            self.assertEqual("VACUUM" in statements, vacuumed)
+            os.remove(self.path)
+
+    def test_shared_cache_leaves_cleanup_to_owner(self):
+        owner = ResponseCache(self.path, 100, max_entries=1, clock=self.clock)
+        with ResponseCache(self.path, 100, clock=self.clock, shared=True) as shard:
+            shard.put('1', 'detail', '1')
+            self.clock.now += 1
+            shard.put('2', 'detail', '2')
+            self.assertIsNone(owner.get('1', 'detail'))
+        self.assertEqual(owner.get('1', 'detail'), '1')
+        owner.close()
+        with ResponseCache(self.path, 100, clock=self.clock) as cache:
+            self.assertIsNone(cache.get('1', 'detail'))
+            self.assertEqual(cache.get('2', 'detail'), '2')
+
+    def test_find_latest_cache_file(self):
+        for name in ['12_finstat_cache.sqlite', '345_finstat_cache.sqlite', '345_finstat_cache.sqlite.manifest']:
+            open(os.path.join(self.tmp_dir.name, name), 'w').close()
+        self.assertEqual(os.path.basename(find_cache_file(self.tmp_dir.name)), '345_finstat_cache.sqlite')
+        self.assertIsNone(find_cache_file(os.path.join(self.tmp_dir.name, 'missing')))
+
+
+if __name__ == "__main__":
+    unittest.main()
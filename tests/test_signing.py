@@ -0,0 +1,25 @@
+import hashlib
+import unittest
+
+from benchmarks.legacy import get_hash
+from finstat.signing import Signer
+
+
+class TestSigner(unittest.TestCase):
+
+    def test_matches_full_hash_string(self):
+        signer = Signer('api', 'private')
+        for ico in ['35757442', '00151653']:
+            expected = hashlib.sha256(f"SomeSalt+api+private++{ico}+ended".encode()).hexdigest()
+            self.assertEqual(signer.sign(ico), expected)
+            self.assertEqual(signer.sign(ico), get_hash('api', 'private', ico))
+
+    def test_repeated_icos_are_not_hashed_again(self):
+        signer = Signer('api', 'private', cache_size=2)
+        signer.sign('35757442')
+        signer.sign('35757442')
+        self.assertEqual(signer.sign.cache_info().hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import csv
+import gzip
+import os
+import random
+import tempfile
+import unittest
+
+from finstat.sliced_writer import FinstatSlicedWriter
+
+
+def read_slice(path):
+    with gzip.open(path, 'rt', newline='', encoding='utf-8') as slice_file:
+        return list(csv.reader(slice_file))
+
+
+class TestFinstatSlicedWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'out.csv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_slices_by_rows(self):
+        with FinstatSlicedWriter(self.path, ['Ico'], max_rows=2) as writer:
+            writer.write_all([{'Ico': str(i), 'Name': f'Company {i}'} for i in range(5)])
+        self.assertEqual(sorted(os.listdir(self.path)), ['part-00000.csv.gz', 'part-00001.csv.gz',
+                                                         'part-00002.csv.gz'])
+        self.assertEqual(writer.columns, ['Ico', 'Name'])
+        self.assertEqual(writer.rows_written, 5)
+        rows = [row for path in writer.file_paths for row in read_slice(path)]
+        self.assertEqual(rows, [[str(i), f'Company {i}'] for i in range(5)])
+
+    def test_slices_by_size(self):
+        generator = random.Random(1)
+        with FinstatSlicedWriter(self.path, max_bytes=64 * 1024) as writer:
+            writer.write_all({'Ico': str(i), 'Text': '%030x' % generator.getrandbits(120)} for i in range(20000))
+        self.assertGreater(len(writer.file_paths), 2)
+        for path in writer.file_paths:
+            # the compressor buffers part of the data, so the size is checked with some slack
+            self.assertLess(os.path.getsize(path), 2 * 64 * 1024)
+        self.assertEqual(sum(len(read_slice(path)) for path in writer.file_paths), 20000)
+
+    def test_pads_rows_written_before_new_columns(self):
+        with FinstatSlicedWriter(self.path, max_rows=2) as writer:
+            writer.write_all([{'Ico': '1'}, {'Ico': '2'}, {'Ico': '3', 'Name': 'c'}])
+        self.assertEqual(read_slice(writer.file_paths[0]), [['1', ''], ['2', '']])
+        self.assertEqual(read_slice(writer.file_paths[1]), [['3', 'c']])
+
+    def test_empty_table_has_one_empty_slice(self):
+        with FinstatSlicedWriter(self.path, ['unavailable_ico']) as writer:
+            pass
+        self.assertEqual(writer.rows_written, 0)
+        self.assertEqual(os.listdir(self.path), ['part-00000.csv.gz'])
+        self.assertEqual(read_slice(writer.file_paths[0]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
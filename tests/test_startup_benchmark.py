@@ -0,0 +1,25 @@
+import unittest
+
+from benchmarks.startup_benchmark import LAZY_MODULES, measure_startup, parse_import_times
+
+HOT_PATH_MODULES = ["component", "finstat.bulk", "finstat.content_hash", "finstat.fetcher", "finstat.finstat_result",
+                    "finstat.ico_reader", "finstat.parquet_writer", "finstat.signing", "finstat.xml_parser"]
+
+
+class TestStartupBenchmark(unittest.TestCase):
+
+    def test_parse_import_times(self):
+        stderr = ("import time: self [us] | cumulative | imported package\n"
+                  "import time:       200 |        300 |   _csv\n"
+                  "import time:       600 |        900 | csv\n")
+        self.assertEqual(parse_import_times(stderr), {"_csv": 300, "csv": 900})
+
+    def test_hot_path_does_not_import_lazy_modules(self):
+        _, import_times = measure_startup(", ".join(HOT_PATH_MODULES))
+        self.assertIn("component", import_times)
+        self.assertIn("finstat.xml_parser", import_times)
+        self.assertEqual([module for module in LAZY_MODULES if module in import_times], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from finstat.throttling import DailyBudget, DailyBudgetExceeded, MIN_RATE, TokenBucket
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_acquire_waits_for_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, burst=1, clock=clock, sleep=clock.sleep)
+        for _ in range(5):
+            bucket.acquire()
+        # the first token is available right away, the other four at 2 per second
+        self.assertAlmostEqual(clock.now, 2.0)
+
+    def test_throttle_and_recover(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+        bucket.throttle()
+        self.assertEqual(bucket.rate, 5)
+        for _ in range(100):
+            bucket.throttle()
+        self.assertEqual(bucket.rate, MIN_RATE)
+        for _ in range(100):
+            bucket.recover()
+        self.assertEqual(bucket.rate, 10)
+
+
+class TestDailyBudget(unittest.TestCase):
+
+    def test_limit_counts_previous_runs(self):
+        budget = DailyBudget(3)
+        budget = DailyBudget(3, budget.day, 2)
+        budget.spend()
+        with self.assertRaises(DailyBudgetExceeded):
+            budget.spend()
+        self.assertEqual(budget.to_state()['used'], 3)
+
+    def test_new_day_resets_usage(self):
+        budget = DailyBudget(3, '2010-10-10', 3)
+        budget.spend()
+        self.assertEqual(budget.used, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
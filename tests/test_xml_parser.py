@@ -0,0 +1,31 @@
+import os
+import unittest
+
+from benchmarks.legacy import parse_with_xmltodict
+from finstat.xml_parser import parse_detail_result
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
+
+
+class TestXmlParser(unittest.TestCase):
+
+    def assert_same_as_xmltodict(self, response_text):
+        expected = parse_with_xmltodict(response_text)
+        row = parse_detail_result(response_text)
+        self.assertEqual(list(row.keys()), list(expected.keys()))
+        self.assertEqual(row, expected)
+
+    def test_detail_result_matches_flatten_json(self):
+        with open(os.path.join(DATA_DIR, "detail_result.xml"), encoding="utf-8") as f:
+            self.assert_same_as_xmltodict(f.read())
+
+    def test_attributes_and_text(self):
+        self.assert_same_as_xmltodict('<DetailResult a="1"><B c="2">x</B><C><D/>tail</C>text</DetailResult>')
+
+    def test_nested_namespace_declarations(self):
+        self.assert_same_as_xmltodict('<DetailResult xmlns="urn:a"><B xmlns:x="urn:x" x:nil="true"/>'
+                                      '<x:C xmlns:x="urn:x">1</x:C></DetailResult>')
+
+
+if __name__ == "__main__":
+    unittest.main()